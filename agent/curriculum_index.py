@@ -0,0 +1,425 @@
+# Curriculum retrieval: an on-disk BM25 index over our lesson material
+#
+#   python agent/curriculum_index.py ingest ./curriculum-index lessons/*.md
+#   python agent/curriculum_index.py query ./curriculum-index "black holes" -k 4 --budget 600
+#   python agent/curriculum_index.py merge ./curriculum-index
+#
+# The index is a directory of immutable segments plus a manifest. Each
+# ingest writes one new segment for the new or changed files only. Posting
+# lists, document lengths and passage text are memory-mapped when loaded.
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+# Passages are built from whole paragraphs up to about this many words
+PASSAGE_WORDS = 120
+# Merge all segments into one once there are more than this many
+MAX_SEGMENTS = 8
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"[^.!?]+[.!?]*")
+STOPWORDS = frozenset("""
+a about an and are as at be been but by can do does for from has have how i if in into is it its
+of on or so than that the their them then there these they this to was we were what when where
+which while who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens without stopwords, with a light plural strip."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def split_passages(text: str, max_words: int = PASSAGE_WORDS) -> list:
+    """
+    Groups paragraphs into passages of at most `max_words` words. A
+    paragraph longer than that is split at sentence boundaries.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph.split()) <= max_words:
+            pieces.append(paragraph)
+            continue
+        current = []
+        for sentence in _SENTENCE_RE.findall(paragraph):
+            words = sentence.split()
+            if current and len(current) + len(words) > max_words:
+                pieces.append(" ".join(current))
+                current = []
+            current.extend(words)
+        if current:
+            pieces.append(" ".join(current))
+
+    passages, current = [], []
+    for piece in pieces:
+        words = piece.split()
+        if current and len(current) + len(words) > max_words:
+            passages.append(" ".join(current))
+            current = []
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def split_sections(text: str) -> list:
+    """Splits markdown into (heading, body) pairs; text before the first heading has heading None."""
+    sections, heading, body = [], None, []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            sections.append((heading, "\n".join(body)))
+            heading, body = line.lstrip("#").strip(), []
+        else:
+            body.append(line)
+    sections.append((heading, "\n".join(body)))
+    return [(heading, body) for heading, body in sections if body.strip()]
+
+
+# =========================
+# Segments
+# =========================
+def write_segment(index_dir: str, passages: list) -> dict:
+    """
+    Writes one immutable segment for `passages` (dicts with text, source and
+    title) and returns its manifest entry.
+    """
+    name = f"seg-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    tmp_dir = os.path.join(index_dir, f".{name}.tmp")
+    os.makedirs(tmp_dir)
+
+    postings = {}
+    lengths = np.zeros(len(passages), dtype=np.int32)
+    for doc, passage in enumerate(passages):
+        counts = {}
+        tokens = tokenize(f"{passage['title']} {passage['text']}")
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        lengths[doc] = len(tokens)
+        for token, tf in counts.items():
+            postings.setdefault(token, []).append((doc, tf))
+
+    vocabulary = {}
+    docs, freqs = [], []
+    for term in sorted(postings):
+        entries = postings[term]
+        vocabulary[term] = [len(docs), len(entries)]
+        for doc, tf in entries:
+            docs.append(doc)
+            freqs.append(tf)
+    np.save(os.path.join(tmp_dir, "docs.npy"), np.array(docs, dtype=np.int32))
+    np.save(os.path.join(tmp_dir, "freqs.npy"), np.array(freqs, dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "lengths.npy"), lengths)
+    with open(os.path.join(tmp_dir, "vocabulary.json"), "w") as f:
+        json.dump(vocabulary, f, separators=(",", ":"))
+
+    # Passages as JSON lines, addressed by byte offset
+    offsets = np.zeros(len(passages) + 1, dtype=np.int64)
+    with open(os.path.join(tmp_dir, "passages.jsonl"), "wb") as f:
+        for doc, passage in enumerate(passages):
+            f.write(json.dumps(passage, ensure_ascii=False).encode() + b"\n")
+            offsets[doc + 1] = f.tell()
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+
+    os.replace(tmp_dir, os.path.join(index_dir, name))
+    return {"name": name, "docs": len(passages), "total_length": int(lengths.sum()), "deleted": []}
+
+
+class Segment:
+    """A loaded segment; the large arrays and the passage file are memory-mapped."""
+    def __init__(self, path: str, deleted: list):
+        self.path = path
+        with open(os.path.join(path, "vocabulary.json")) as f:
+            self.vocabulary = json.load(f)
+        self.docs = np.load(os.path.join(path, "docs.npy"), mmap_mode="r")
+        self.freqs = np.load(os.path.join(path, "freqs.npy"), mmap_mode="r")
+        self.lengths = np.load(os.path.join(path, "lengths.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        with open(os.path.join(path, "passages.jsonl"), "rb") as f:
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if len(self.lengths) else b""
+        self.deleted = np.array(deleted, dtype=np.int64)
+
+    def postings(self, term: str):
+        entry = self.vocabulary.get(term)
+        if entry is None:
+            return None
+        start, count = entry
+        return self.docs[start:start + count], self.freqs[start:start + count]
+
+    def passage(self, doc: int) -> dict:
+        return json.loads(self._text[int(self.offsets[doc]):int(self.offsets[doc + 1])])
+
+
+# =========================
+# Index
+# =========================
+class CurriculumIndex:
+    """
+    BM25 over all segments of an index directory. Collection statistics
+    (document count, average length, document frequencies) are summed across
+    segments so scores are comparable between them.
+    """
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        # (segments, live document count, average length), swapped as one on refresh
+        self._state = ([], 0, 0.0)
+        self.refresh()
+
+    # --- Manifest ---
+    @staticmethod
+    def read_manifest(index_dir: str) -> dict:
+        path = os.path.join(index_dir, MANIFEST)
+        if not os.path.exists(path):
+            return {"segments": [], "sources": {}}
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def write_manifest(index_dir: str, manifest: dict):
+        tmp = os.path.join(index_dir, f"{MANIFEST}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, os.path.join(index_dir, MANIFEST))
+
+    def refresh(self):
+        """Reloads the segment list if an ingest or merge has changed the manifest."""
+        try:
+            mtime = os.stat(os.path.join(self.index_dir, MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return
+            manifest = self.read_manifest(self.index_dir)
+            # Unchanged segments are reused; dropped ones are unmapped once no search holds them
+            loaded = {(s.path, len(s.deleted)): s for s in self._state[0]}
+            segments = []
+            for entry in manifest["segments"]:
+                path = os.path.join(self.index_dir, entry["name"])
+                segment = loaded.get((path, len(entry["deleted"])))
+                segments.append(segment or Segment(path, entry["deleted"]))
+            total_docs = sum(s["docs"] for s in manifest["segments"])
+            total_length = sum(s["total_length"] for s in manifest["segments"])
+            live_docs = total_docs - sum(len(s["deleted"]) for s in manifest["segments"])
+            self._state = (segments, live_docs, total_length / total_docs if total_docs else 0.0)
+            self._manifest_mtime = mtime
+
+    # --- Search ---
+    def search(self, query: str, k: int = 5) -> list:
+        """Returns the top `k` passages as dicts with text, source, title and score."""
+        self.refresh()
+        segments, doc_count, avg_length = self._state
+        terms = set(tokenize(query))
+        if not terms or not doc_count:
+            return []
+
+        idf = {}
+        for term in terms:
+            df = sum(s.vocabulary[term][1] for s in segments if term in s.vocabulary)
+            if df:
+                idf[term] = float(np.log(1 + (max(doc_count - df, 0) + 0.5) / (df + 0.5)))
+
+        candidates = []
+        for segment in segments:
+            scores = None
+            for term in idf:
+                found = segment.postings(term)
+                if found is None:
+                    continue
+                docs, tf = found
+                norm = self.k1 * (1 - self.b + self.b * segment.lengths[docs] / avg_length)
+                if scores is None:
+                    scores = np.zeros(len(segment.lengths), dtype=np.float32)
+                scores[docs] += idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if scores is None:
+                continue
+            if len(segment.deleted):
+                scores[segment.deleted] = 0
+            top = min(k, int(np.count_nonzero(scores)))
+            if not top:
+                continue
+            best = np.argpartition(-scores, top - 1)[:top]
+            candidates.extend((float(scores[doc]), segment, int(doc)) for doc in best)
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        results = []
+        for score, segment, doc in candidates[:k]:
+            passage = segment.passage(doc)
+            passage["score"] = round(score, 3)
+            results.append(passage)
+        return results
+
+    def retrieve(self, query: str, k: int = 4, token_budget: int = 600) -> list:
+        """
+        The best of the top `k` passages that fit in `token_budget` prompt
+        tokens together, in score order. Passages too long for what is left
+        of the budget are skipped in favour of shorter lower-ranked ones.
+        """
+        selected, used = [], 0
+        for passage in self.search(query, k):
+            cost = estimate_tokens(passage["text"])
+            if used + cost <= token_budget:
+                selected.append(passage)
+                used += cost
+        return selected
+
+
+def format_context(passages: list) -> str:
+    return "\n".join(f"[{i}] ({p['title']}) {p['text']}" for i, p in enumerate(passages, 1))
+
+
+# =========================
+# Building
+# =========================
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def ingest(index_dir: str, paths: list, max_words: int = PASSAGE_WORDS) -> dict:
+    """
+    Adds new and changed text/markdown files as one new segment. Passages of
+    changed files, and of indexed files that no longer exist, are marked
+    deleted in their old segment. Sources are keyed by absolute path.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    manifest = CurriculumIndex.read_manifest(index_dir)
+    segments = {s["name"]: s for s in manifest["segments"]}
+    # Manifests from older versions keyed sources relative to the working directory
+    manifest["sources"] = {os.path.abspath(source): entry for source, entry in manifest["sources"].items()}
+    passages, added, replaced, removed = [], {}, 0, 0
+    for source in [s for s in manifest["sources"] if not os.path.exists(s)]:
+        entry = manifest["sources"].pop(source)
+        segments[entry["segment"]]["deleted"].extend(entry["docs"])
+        removed += 1
+    for path in paths:
+        source = os.path.abspath(path)
+        digest = file_digest(path)
+        previous = manifest["sources"].get(source)
+        if previous and previous["sha256"] == digest:
+            continue
+        if previous:
+            segments[previous["segment"]]["deleted"].extend(previous["docs"])
+            replaced += 1
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        default_title = os.path.splitext(os.path.basename(path))[0].replace("_", " ").replace("-", " ")
+        start = len(passages)
+        for heading, body in split_sections(text):
+            passages.extend({"text": p, "source": source, "title": heading or default_title}
+                            for p in split_passages(body, max_words))
+        added[source] = {"sha256": digest, "docs": list(range(start, len(passages)))}
+
+    if added:
+        segment = write_segment(index_dir, passages)
+        manifest["segments"].append(segment)
+        for source, entry in added.items():
+            manifest["sources"][source] = {"segment": segment["name"], **entry}
+    if added or removed:
+        CurriculumIndex.write_manifest(index_dir, manifest)
+    if len(manifest["segments"]) > MAX_SEGMENTS:
+        merge(index_dir)
+    return {"files": len(added), "passages": len(passages), "replaced": replaced, "removed": removed,
+            "segments": len(CurriculumIndex.read_manifest(index_dir)["segments"])}
+
+
+def merge(index_dir: str) -> dict:
+    """Rewrites all live passages into a single segment and drops the old ones."""
+    manifest = CurriculumIndex.read_manifest(index_dir)
+    old_names = [s["name"] for s in manifest["segments"]]
+    passages, sources, opened = [], {}, {}
+    for source, entry in manifest["sources"].items():
+        segment = opened.get(entry["segment"])
+        if segment is None:
+            segment = opened[entry["segment"]] = Segment(os.path.join(index_dir, entry["segment"]), [])
+        start = len(passages)
+        passages.extend(segment.passage(doc) for doc in entry["docs"])
+        sources[source] = {"segment": None, "sha256": entry["sha256"], "docs": list(range(start, len(passages)))}
+    segment = write_segment(index_dir, passages)
+    for entry in sources.values():
+        entry["segment"] = segment["name"]
+    CurriculumIndex.write_manifest(index_dir, {"segments": [segment], "sources": sources})
+    # Open readers keep their mmaps of the old files until they refresh
+    for name in old_names:
+        shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+    return {"passages": len(passages), "segments_merged": len(old_names)}
+
+
+def collect_files(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.endswith((".md", ".txt")))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Curriculum BM25 index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_cmd = commands.add_parser("ingest", help="add new or changed .md/.txt files, drop deleted ones")
+    ingest_cmd.add_argument("index_dir")
+    ingest_cmd.add_argument("paths", nargs="+", help="files or directories")
+    ingest_cmd.add_argument("--passage-words", type=int, default=PASSAGE_WORDS)
+
+    query_cmd = commands.add_parser("query", help="show the passages a prompt would get")
+    query_cmd.add_argument("index_dir")
+    query_cmd.add_argument("query")
+    query_cmd.add_argument("-k", type=int, default=4)
+    query_cmd.add_argument("--budget", type=int, default=600, help="prompt token budget")
+
+    merge_cmd = commands.add_parser("merge", help="merge all segments into one")
+    merge_cmd.add_argument("index_dir")
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        print(json.dumps(ingest(args.index_dir, collect_files(args.paths), args.passage_words)))
+    elif args.command == "merge":
+        print(json.dumps(merge(args.index_dir)))
+    else:
+        index = CurriculumIndex(args.index_dir)
+        start = time.perf_counter()
+        passages = index.retrieve(args.query, args.k, args.budget)
+        elapsed = (time.perf_counter() - start) * 1000
+        for i, passage in enumerate(passages, 1):
+            print(f"[{i}] {passage['score']:.2f}  {passage['source']} ({passage['title']})\n    {passage['text']}\n")
+        print(f"{len(passages)} passages, ~{sum(estimate_tokens(p['text']) for p in passages)} tokens, "
+              f"{elapsed:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
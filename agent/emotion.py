@@ -1,9 +1,13 @@
 import os
+import re
 import sys
-import google.generativeai as genai
-from transformers import pipeline
+import threading
 from flask import Flask, request, jsonify, Response
 from datetime import datetime
+from llm_scheduler import INTERACTIVE, LLMScheduler, RateLimited, install_scheduler, learner_id
+from profiler import install_profiler, install_signal_handler
+
+DEFAULT_EMOTION_MODEL = "michellejieli/emotion_text_classifier"
 
 
 # --- Emotion Agent Class ---
@@ -12,17 +16,75 @@ class EmotionAgent:
     An agent that detects a user's emotional state from text and
     adapts its conversational tone accordingly using an LLM.
     """
-    def __init__(self, api_key: str):
+    # Inputs longer than this are classified as a batch of sentence windows
+    LONG_TEXT_CHARS = 400
+    # Target window size; well under the classifier's 512-token limit
+    WINDOW_CHARS = 320
+    MAX_BATCH_SIZE = 64
+
+    # Short small-talk messages answered from templates instead of the LLM
+    FAST_PATH_INTENTS = {
+        'thanks': re.compile(r"^(thanks?|thx|ty|thank (you|u)|cheers)( (so|very) much| a lot| again)?$"),
+        'goodbye': re.compile(r"^((ok|okay|alright|thanks?|thank you) )?(bye|goodbye|bye bye|see (you|ya)( later)?|good ?night|gtg|talk (to you )?later)$"),
+        'greeting': re.compile(r"^(hi|hello|hey|hiya|good (morning|afternoon|evening))( there)?$"),
+        'ack': re.compile(r"^(ok|okay|k|cool|got it|sure|alright|nice|great|sounds good)$"),
+    }
+    FAST_PATH_REPLIES = {
+        'thanks': {
+            'joy': "You're so welcome! I'm really happy I could help. 😊",
+            'sadness': "You're welcome. I'm here for you whenever you need me. 💙",
+            'surprise': "You're welcome! Glad that was useful.",
+            'neutral': "You're welcome! Happy to help anytime.",
+        },
+        'goodbye': {
+            'joy': "Bye for now! Keep that great energy going. 🌟",
+            'sadness': "Take good care of yourself. I'm here whenever you want to talk again. 💙",
+            'surprise': "See you soon!",
+            'neutral': "Goodbye! Come back anytime.",
+        },
+        'greeting': {
+            'joy': "Hi! You sound cheerful today. What's on your mind? 😄",
+            'sadness': "Hi there. I'm glad you reached out. How are you feeling? 💙",
+            'surprise': "Hey! What's up?",
+            'neutral': "Hello! How are you feeling today?",
+        },
+        'ack': {
+            'joy': "Great! Let me know if there's anything else. 😊",
+            'sadness': "Okay. Take your time, I'm right here if you want to share more. 💙",
+            'surprise': "Okay! Anything else on your mind?",
+            'neutral': "Okay! Let me know if there's anything else I can do.",
+        },
+    }
+    # Emotions that always go to the LLM, however short the message
+    ESCALATE_EMOTIONS = ('anger', 'fear', 'disgust')
+
+    def __init__(self, api_key: str, fast_path: bool = True, fast_path_max_words: int = 6,
+                 escalate_emotions: tuple = ESCALATE_EMOTIONS, model_name: str = DEFAULT_EMOTION_MODEL,
+                 llm_scheduler: LLMScheduler = None, emotion_classifier=None, gemini_model=None):
         print("Initializing Emotion Agent...")
+        self.fast_path = fast_path
+        self.fast_path_max_words = fast_path_max_words
+        self.escalate_emotions = set(escalate_emotions)
+        self.llm_scheduler = llm_scheduler
+        self._metrics_lock = threading.Lock()
+        self.metrics = {'local': 0, 'llm': 0, 'llm_errors': 0, 'classifier_errors': 0}
         if not api_key:
             raise ValueError("Google API Key not found.")
-        genai.configure(api_key=api_key)
-        self.gemini_model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        if gemini_model is not None:
+            self.gemini_model = gemini_model
+        else:
+            from gemini import gemini_model as build_model
+            self.gemini_model = build_model('gemini-1.5-flash-latest', api_key)
+        if emotion_classifier is not None:
+            # Preloaded classifier, e.g. a small local model for benchmarks
+            self.emotion_classifier = emotion_classifier
+            return
         try:
             print("Loading emotion detection model...")
+            from transformers import pipeline
             self.emotion_classifier = pipeline(
                 "text-classification", 
-                model="michellejieli/emotion_text_classifier"
+                model=model_name
             )
             print("Emotion Agent is ready.")
         except Exception as e:
@@ -30,15 +92,132 @@ class EmotionAgent:
             sys.exit(1)
 
     def detect_emotion(self, text: str) -> str:
+        """
+        The overall emotion of `text`. The chat carries on with "neutral" if
+        the classifier fails; failures are counted in `classifier_errors`.
+        """
+        if len(text) > self.LONG_TEXT_CHARS:
+            return self.detect_emotion_timeline(text)['label']
         try:
-            results = self.emotion_classifier(text)
+            results = self.emotion_classifier(text, truncation=True)
             return results[0]['label']
         except Exception as e:
             print(f"Could not classify emotion: {e}", file=sys.stderr)
+            self._count('classifier_errors')
             return "neutral"
 
-    def adapt_and_respond(self, user_input: str) -> tuple[str, str]:
+    def segment_text(self, text: str) -> list[tuple[int, int]]:
+        """
+        Splits text into (start, end) windows of whole sentences of at most
+        WINDOW_CHARS characters. A single sentence longer than that is cut
+        at word boundaries.
+        """
+        pieces = []
+        for sentence in re.finditer(r'[^.!?\n]+[.!?]*', text):
+            start, end = sentence.span()
+            if not sentence.group().strip():
+                continue
+            if end - start <= self.WINDOW_CHARS:
+                pieces.append((start, end))
+                continue
+            chunk_start = chunk_end = None
+            for word in re.finditer(r'\S+', sentence.group()):
+                w_start, w_end = start + word.start(), start + word.end()
+                if chunk_start is not None and w_end - chunk_start > self.WINDOW_CHARS:
+                    pieces.append((chunk_start, chunk_end))
+                    chunk_start = None
+                if chunk_start is None:
+                    chunk_start = w_start
+                chunk_end = w_end
+            if chunk_start is not None:
+                pieces.append((chunk_start, chunk_end))
+
+        windows = []
+        for start, end in pieces:
+            if windows and end - windows[-1][0] <= self.WINDOW_CHARS:
+                windows[-1] = (windows[-1][0], end)
+            else:
+                windows.append((start, end))
+        return windows
+
+    def detect_emotion_timeline(self, text: str) -> dict:
+        """
+        Classifies every window of a long text in one batched pass and
+        aggregates the per-window scores, weighted by window length.
+
+        Returns {'label', 'scores', 'timeline'} where timeline holds one
+        {'start', 'end', 'text', 'label', 'score'} entry per window. If the
+        classifier fails, the label is "neutral" and 'error' says why.
+        """
+        windows = self.segment_text(text)
+        if not windows:
+            return {'label': 'neutral', 'scores': {}, 'timeline': []}
+        segments = [text[start:end].strip() for start, end in windows]
+        try:
+            results = self.emotion_classifier(
+                segments, top_k=None, truncation=True,
+                batch_size=min(len(segments), self.MAX_BATCH_SIZE)
+            )
+        except Exception as e:
+            print(f"Could not classify emotion: {e}", file=sys.stderr)
+            self._count('classifier_errors')
+            return {'label': 'neutral', 'scores': {}, 'timeline': [], 'error': f"Emotion classifier failed: {e}"}
+
+        totals = {}
+        timeline = []
+        weight_sum = 0
+        for (start, end), segment, scores in zip(windows, segments, results):
+            weight = len(segment)
+            weight_sum += weight
+            for item in scores:
+                totals[item['label']] = totals.get(item['label'], 0.0) + item['score'] * weight
+            top = max(scores, key=lambda item: item['score'])
+            timeline.append({
+                'start': start,
+                'end': end,
+                'text': segment,
+                'label': top['label'],
+                'score': round(top['score'], 4),
+            })
+        scores = {label: round(total / weight_sum, 4) for label, total in totals.items()}
+        return {
+            'label': max(scores, key=scores.get),
+            'scores': scores,
+            'timeline': timeline,
+        }
+
+    def match_fast_path(self, text: str) -> str:
+        """Returns the small-talk intent of a short message, or None."""
+        words = re.findall(r"[a-z']+", text.lower())
+        if not words or len(words) > self.fast_path_max_words:
+            return None
+        normalized = " ".join(words)
+        for intent, pattern in self.FAST_PATH_INTENTS.items():
+            if pattern.match(normalized):
+                return intent
+        return None
+
+    def _count(self, route: str):
+        with self._metrics_lock:
+            self.metrics[route] += 1
+
+    def get_metrics(self) -> dict:
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        total = metrics['local'] + metrics['llm']
+        metrics['total'] = total
+        metrics['local_fraction'] = round(metrics['local'] / total, 4) if total else 0.0
+        return metrics
+
+    def adapt_and_respond(self, user_input: str, learner: str = "anonymous") -> tuple[str, str]:
+        intent = self.match_fast_path(user_input) if self.fast_path else None
         detected_emotion = self.detect_emotion(user_input)
+        if intent and detected_emotion not in self.escalate_emotions:
+            replies = self.FAST_PATH_REPLIES[intent]
+            self._count('local')
+            return replies.get(detected_emotion, replies['neutral']), detected_emotion
+
+        self._count('llm')
         tone_guidelines = {
             'sadness': "Respond with empathy, gentleness, and support.",
             'joy': "Share in their happiness! Respond with a celebratory and positive tone.",
@@ -56,10 +235,19 @@ class EmotionAgent:
         **Your Response:**
         """
         try:
-            response = self.gemini_model.generate_content(final_prompt)
+            if self.llm_scheduler is not None:
+                response = self.llm_scheduler.call(
+                    self.gemini_model.generate_content, final_prompt,
+                    learner=learner, route="get_response", priority=INTERACTIVE
+                )
+            else:
+                response = self.gemini_model.generate_content(final_prompt)
             return response.text.strip(), detected_emotion
+        except RateLimited:
+            raise
         except Exception as e:
             print(f"Error calling Gemini API: {e}", file=sys.stderr)
+            self._count('llm_errors')
             return "I'm having trouble connecting right now.", "neutral"
 
 
@@ -251,7 +439,7 @@ HTML_TEMPLATE = """
                 addMessage(message, 'user', data.emotion);
                 
                 // Add agent response
-                addMessage(data.response, 'agent');
+                addMessage(data.response || data.error || "Sorry, something went wrong on the server.", 'agent');
                 
             } catch (error) {
                 console.error("Error:", error);
@@ -277,15 +465,30 @@ HTML_TEMPLATE = """
 
 # --- Flask Web Server ---
 app = Flask(__name__)
+profiler = install_profiler(app)
+install_signal_handler(profiler)
+llm_scheduler = install_scheduler(app, LLMScheduler.from_env("get_response"))
 
-# Initialize the agent
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    print("ERROR: The GOOGLE_API_KEY environment variable is not set.", file=sys.stderr)
-    print("Please set your Google API key: export GOOGLE_API_KEY='API KEY'")
-    sys.exit(1)
+def create_emotion_agent(llm_scheduler: LLMScheduler = None) -> EmotionAgent:
+    """Builds the agent from environment settings. Raises ValueError without an API key."""
+    return EmotionAgent(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        fast_path=os.getenv("EMOTION_FAST_PATH", "1") != "0",
+        fast_path_max_words=int(os.getenv("EMOTION_FAST_PATH_MAX_WORDS", 6)),
+        model_name=os.getenv("EMOTION_MODEL", DEFAULT_EMOTION_MODEL),
+        llm_scheduler=llm_scheduler,
+    )
 
-emotion_agent = EmotionAgent(api_key=api_key)
+# Built on first request, so `flask --app emotion run` and WSGI servers work too
+emotion_agent = None
+_emotion_agent_lock = threading.Lock()
+
+def get_emotion_agent() -> EmotionAgent:
+    global emotion_agent
+    with _emotion_agent_lock:
+        if emotion_agent is None:
+            emotion_agent = create_emotion_agent(llm_scheduler)
+        return emotion_agent
 
 @app.route('/')
 def home():
@@ -300,14 +503,35 @@ def get_response():
         return jsonify({'error': 'No message provided'}), 400
     
     # Get the response and detected emotion from the agent
-    agent_response, detected_emotion = emotion_agent.adapt_and_respond(user_message)
+    agent_response, detected_emotion = get_emotion_agent().adapt_and_respond(user_message, learner=learner_id(request))
     
     return jsonify({
         'response': agent_response, 
         'emotion': detected_emotion
     })
 
+@app.route('/metrics')
+def metrics():
+    """Counts of replies served locally vs. by the LLM."""
+    return jsonify(get_emotion_agent().get_metrics())
+
+@app.route('/detect_emotion', methods=['POST'])
+def detect_emotion():
+    """Returns the overall emotion and a per-segment timeline for long text."""
+    text = request.json.get('text')
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    result = get_emotion_agent().detect_emotion_timeline(text)
+    if 'error' in result:
+        return jsonify(result), 503
+    return jsonify(result)
+
 if __name__ == '__main__':
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("ERROR: The GOOGLE_API_KEY environment variable is not set.", file=sys.stderr)
+        print("Please set your Google API key: export GOOGLE_API_KEY='API KEY'")
+        sys.exit(1)
+    get_emotion_agent()
     print("Starting Emotion Agent server...")
     print("Open your browser and go to http://127.0.0.1:5000")
     app.run(debug=True, host='127.0.0.1', port=5000)
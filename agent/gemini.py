@@ -0,0 +1,37 @@
+# Gemini models bound to their own API key
+#
+# genai.configure() sets one process-wide key, so two agents with different
+# keys in the same process (the dashboard loads both) would overwrite each
+# other. GeminiModel talks to the public google.ai.generativelanguage client
+# directly, with its own key, and can put a timeout on every call.
+# Tested against google-generativeai==0.3.2 / google-ai-generativelanguage 0.4.x.
+
+
+class GeminiModel:
+    """
+    The subset of genai.GenerativeModel the agents use: `generate_content(prompt)`
+    returning a response with `.text`. Calls that take longer than `timeout`
+    seconds raise google.api_core.exceptions.DeadlineExceeded.
+    """
+    def __init__(self, model_name: str, api_key: str, timeout: float = None):
+        import google.ai.generativelanguage as glm
+        self._glm = glm
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        self.timeout = timeout
+        self._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+    def generate_content(self, prompt: str, timeout: float = None):
+        from google.generativeai.types import GenerateContentResponse
+        glm = self._glm
+        request = glm.GenerateContentRequest(
+            model=self.model_name,
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+        )
+        timeout = timeout if timeout is not None else self.timeout
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        return GenerateContentResponse.from_response(self._client.generate_content(request, **kwargs))
+
+
+def gemini_model(model_name: str, api_key: str, timeout: float = None) -> GeminiModel:
+    """A Gemini model that calls the API with `api_key`, leaving the global genai config alone."""
+    return GeminiModel(model_name, api_key, timeout)
@@ -0,0 +1,296 @@
+# Background job queue for long-running agent work
+import heapq
+import json
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+# Lower numbers run first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+class Job:
+    """
+    Handle passed to a job handler. Handlers call `progress()` between
+    units of work; it records progress and raises JobCancelled once a
+    cancellation has been requested.
+    """
+    def __init__(self, queue, job_id: str, kind: str, user: str):
+        self.queue = queue
+        self.id = job_id
+        self.kind = kind
+        self.user = user
+
+    @property
+    def cancelled(self) -> bool:
+        return self.queue.store.get(self.id)["cancel_requested"]
+
+    def progress(self, fraction: float, message: str = None):
+        self.queue.store.update(self.id, progress=max(0.0, min(1.0, fraction)), message=message)
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+
+class JobStore:
+    """SQLite-backed job records, so queued and finished jobs survive restarts."""
+    COLUMNS = ("id", "kind", "user", "priority", "status", "payload", "result", "error",
+               "progress", "message", "cancel_requested", "created", "started", "finished")
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                user TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority, created)")
+
+    def insert(self, kind: str, user: str, priority: int, payload) -> dict:
+        job = {
+            "id": uuid.uuid4().hex, "kind": kind, "user": user, "priority": priority,
+            "status": QUEUED, "payload": json.dumps(payload), "created": time.time(),
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, user, priority, status, payload, created) "
+                "VALUES (:id, :kind, :user, :priority, :status, :payload, :created)", job
+            )
+        return job
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def pending(self) -> list:
+        """Requeues jobs interrupted by a restart and returns everything waiting to run."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE status IN (?, ?) AND cancel_requested = 1",
+                (CANCELLED, time.time(), QUEUED, RUNNING)
+            )
+            self._conn.execute("UPDATE jobs SET status = ?, started = NULL WHERE status = ?", (QUEUED, RUNNING))
+            return self._conn.execute(
+                "SELECT id, kind, user, priority, created FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchall()
+
+
+class JobQueue:
+    """
+    A local worker pool over a JobStore.
+
+    Jobs run in priority order (then submission order), with at most
+    `per_user_limit` jobs running for the same user at once.
+    """
+    def __init__(self, path: str, workers: int = 2, per_user_limit: int = 1):
+        self.store = JobStore(path)
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self.handlers = {}
+        self._heap = []
+        self._running = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        for job_id, kind, user, priority, created in self.store.pending():
+            heapq.heappush(self._heap, (priority, created, job_id, kind, user))
+
+    def register(self, kind: str, handler):
+        """Registers `handler(job, payload) -> result` for jobs of `kind`."""
+        self.handlers[kind] = handler
+
+    def start(self):
+        """Starts the workers once; safe to call on every request."""
+        if self._threads:
+            return self
+        with self._start_lock:
+            if not self._threads:
+                threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                           for i in range(self.workers)]
+                for thread in threads:
+                    thread.start()
+                self._threads = threads
+        return self
+
+    def submit(self, kind: str, payload, user: str = "anonymous", priority: int = PRIORITY_NORMAL) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = self.store.insert(kind, user, priority, payload)
+        with self._cond:
+            heapq.heappush(self._heap, (priority, job["created"], job["id"], kind, user))
+            self._cond.notify()
+        return job["id"]
+
+    def get(self, job_id: str) -> dict:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a queued job at once, or asks a running one to stop at its next progress()."""
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in (QUEUED, RUNNING):
+            return False
+        self.store.update(job_id, cancel_requested=1)
+        with self._cond:
+            for i, entry in enumerate(self._heap):
+                if entry[2] == job_id:
+                    self._heap.pop(i)
+                    heapq.heapify(self._heap)
+                    self.store.update(job_id, status=CANCELLED, finished=time.time())
+                    break
+        return True
+
+    def _next_job(self):
+        """Pops the best queued job whose user is under the concurrency cap."""
+        skipped = []
+        found = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._running.get(entry[4], 0) < self.per_user_limit:
+                found = entry
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return found
+
+    def _work(self):
+        while True:
+            with self._cond:
+                entry = self._next_job()
+                while entry is None:
+                    self._cond.wait()
+                    entry = self._next_job()
+                _, _, job_id, kind, user = entry
+                self._running[user] = self._running.get(user, 0) + 1
+
+            try:
+                self._run(job_id, kind, user)
+            finally:
+                with self._cond:
+                    self._running[user] -= 1
+                    self._cond.notify_all()
+
+    def _run(self, job_id: str, kind: str, user: str):
+        record = self.store.get(job_id)
+        if record is None:
+            return
+        if record["cancel_requested"]:
+            self.store.update(job_id, status=CANCELLED, finished=time.time())
+            return
+        self.store.update(job_id, status=RUNNING, started=time.time())
+        try:
+            result = self.handlers[kind](Job(self, job_id, kind, user), record["payload"])
+            self.store.update(job_id, status=DONE, result=result, progress=1.0, finished=time.time())
+        except JobCancelled:
+            self.store.update(job_id, status=CANCELLED, finished=time.time())
+        except Exception as e:
+            print(f"Job {job_id} ({kind}) failed: {e}", file=sys.stderr)
+            self.store.update(job_id, status=FAILED, error=str(e), finished=time.time())
+
+
+# =========================
+# Flask integration
+# =========================
+def caller_identity(req, session) -> str:
+    """
+    The signed-in learner, else the client address. Never a client-supplied
+    header: the identity sets the per-user cap and who may see a job.
+    """
+    return session.get("learner_id") or req.remote_addr or "anonymous"
+
+
+def register_job_routes(app, queue: JobQueue, url_prefix: str = "/jobs"):
+    """
+    POST   {url_prefix}/<kind>    submit; body {"payload": {...}, "priority": 5}
+    GET    {url_prefix}/<job_id>  status, progress and result
+    DELETE {url_prefix}/<job_id>  cancel
+
+    Jobs are visible only to the caller who submitted them.
+    """
+    from flask import jsonify, request, session
+
+    # Workers start in whichever process serves requests, so jobs run under
+    # `flask run`, the debug reloader or a WSGI server alike. Queued jobs left
+    # from a previous run resume on the first request.
+    @app.before_request
+    def _start_workers():
+        # Must return None: Flask uses any other value as the response
+        queue.start()
+
+    def _user():
+        return caller_identity(request, session)
+
+    def _own_job(job_id):
+        job = queue.get(job_id)
+        # Someone else's job is reported as missing, so IDs can't be probed
+        return job if job is not None and job["user"] == _user() else None
+
+    def submit_job(kind):
+        if kind not in queue.handlers:
+            return jsonify({"error": f"Unknown job kind: {kind}"}), 404
+        data = request.get_json(silent=True) or {}
+        if "payload" not in data:
+            return jsonify({"error": "No payload provided in the request body."}), 400
+        priority = int(data.get("priority", PRIORITY_NORMAL))
+        job_id = queue.submit(kind, data["payload"], user=_user(), priority=priority)
+        return jsonify({"job_id": job_id, "status": QUEUED}), 202
+
+    def job_status(job_id):
+        job = _own_job(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found."}), 404
+        job.pop("payload")
+        return jsonify(job)
+
+    def cancel_job(job_id):
+        if _own_job(job_id) is None or not queue.cancel(job_id):
+            return jsonify({"error": "Job not found or already finished."}), 404
+        return job_status(job_id)
+
+    app.add_url_rule(f"{url_prefix}/<kind>", "submit_job", submit_job, methods=["POST"])
+    app.add_url_rule(f"{url_prefix}/<job_id>", "job_status", job_status, methods=["GET"])
+    app.add_url_rule(f"{url_prefix}/<job_id>", "cancel_job", cancel_job, methods=["DELETE"])
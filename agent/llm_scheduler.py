@@ -0,0 +1,292 @@
+# Admission control and fair scheduling for upstream LLM calls
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Priority classes; lower runs first
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class RateLimited(Exception):
+    """Raised when a call is refused; `retry_after` is a hint in seconds."""
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Interactive calls currently waiting on this bucket; batch calls yield to them
+        self.interactive_waiting = 0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def take(self, amount: float = 1.0):
+        self.tokens -= amount
+
+
+class _Ticket:
+    __slots__ = ("event", "abandoned")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.abandoned = False
+
+
+class LLMScheduler:
+    """
+    Sits in front of every LLM call in a process.
+
+    - Admission: each call takes a token from its learner's bucket and its
+      route's bucket, unless it runs under an earlier `admit()` (one HTTP
+      request that makes several calls, or a retry). Interactive calls wait for a token, and are refused if
+      they would wait longer than `max_wait` in total. Batch calls (background
+      jobs) wait as long as it takes, but never take the last
+      `interactive_reserve` of a bucket and never take a token while an
+      interactive call is waiting on that bucket.
+    - Scheduling: at most `max_concurrent` calls run at once. Waiting calls
+      run interactive before batch, and within a class by weighted fair
+      queuing across learners, so one busy learner cannot crowd out others.
+    - Metrics: queue time per priority class, admissions and rejections.
+    """
+    # How often idle per-learner state is dropped
+    PRUNE_INTERVAL = 60.0
+    # How often a batch call re-checks while interactive calls are waiting
+    BATCH_POLL = 0.05
+
+    def __init__(self, max_concurrent: int = 4, learner_rate: float = 20 / 60, learner_burst: float = 5,
+                 route_limits: dict = None, max_wait: float = 30.0, interactive_reserve: float = 0.4):
+        self.max_concurrent = max_concurrent
+        self.learner_rate = learner_rate
+        self.learner_burst = learner_burst
+        self.route_limits = route_limits or {}
+        self.max_wait = max_wait
+        self.interactive_reserve = interactive_reserve
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
+        self._learner_buckets = {}
+        self._route_buckets = {}
+        self._queue = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._service_times = deque(maxlen=200)
+        self._metrics = {
+            name: {"admitted": 0, "rejected": 0, "queue_times": deque(maxlen=1000)}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    @classmethod
+    def from_env(cls, *routes: str):
+        """Builds a scheduler for the given routes from LLM_* environment variables."""
+        return cls(
+            max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", 4)),
+            learner_rate=float(os.getenv("LLM_LEARNER_RPM", 20)) / 60,
+            learner_burst=float(os.getenv("LLM_LEARNER_BURST", 5)),
+            route_limits={route: (float(os.getenv("LLM_ROUTE_RPM", 60)) / 60,
+                                  float(os.getenv("LLM_ROUTE_BURST", 10))) for route in routes},
+            max_wait=float(os.getenv("LLM_MAX_WAIT", 30)),
+            interactive_reserve=float(os.getenv("LLM_INTERACTIVE_RESERVE", 0.4)),
+        )
+
+    # --- Admission ---
+    def _buckets(self, learner: str, route: str) -> list:
+        buckets = []
+        bucket = self._learner_buckets.get(learner)
+        if bucket is None:
+            bucket = self._learner_buckets[learner] = TokenBucket(self.learner_rate, self.learner_burst)
+        buckets.append(bucket)
+        if route in self.route_limits:
+            bucket = self._route_buckets.get(route)
+            if bucket is None:
+                bucket = self._route_buckets[route] = TokenBucket(*self.route_limits[route])
+            buckets.append(bucket)
+        return buckets
+
+    def _prune(self, now: float):
+        """Drops state of idle learners; a full bucket is the same as a new one."""
+        if now - self._last_prune < self.PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        for learner, bucket in list(self._learner_buckets.items()):
+            if not bucket.interactive_waiting and bucket.wait_time(now, bucket.capacity) == 0:
+                del self._learner_buckets[learner]
+        # Finish tags at or behind the virtual clock no longer affect ordering
+        for learner, finish in list(self._last_finish.items()):
+            if finish <= self._virtual_time:
+                del self._last_finish[learner]
+
+    def _batch_wait(self, buckets: list, now: float) -> float:
+        if any(bucket.interactive_waiting for bucket in buckets):
+            return max(self.BATCH_POLL, max(bucket.wait_time(now) for bucket in buckets))
+        waits = []
+        for bucket in buckets:
+            reserve = max(0.0, min(bucket.capacity - 1, bucket.capacity * self.interactive_reserve))
+            waits.append(bucket.wait_time(now, 1 + reserve))
+        return max(waits)
+
+    def _admit(self, learner: str, route: str, priority: int, deadline: float):
+        metrics = self._metrics[PRIORITY_NAMES[priority]]
+        waiting_on = []
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._prune(now)
+                    buckets = self._buckets(learner, route)
+                    if priority == INTERACTIVE:
+                        wait = max(bucket.wait_time(now) for bucket in buckets)
+                    else:
+                        wait = self._batch_wait(buckets, now)
+                    if wait == 0:
+                        for bucket in buckets:
+                            bucket.take()
+                        return
+                    if now + wait > deadline:
+                        metrics["rejected"] += 1
+                        raise RateLimited(wait, f"Rate limit reached for {learner} on {route}.")
+                    if priority == INTERACTIVE and not waiting_on:
+                        waiting_on = buckets
+                        for bucket in waiting_on:
+                            bucket.interactive_waiting += 1
+                time.sleep(wait)
+        finally:
+            if waiting_on:
+                with self._lock:
+                    for bucket in waiting_on:
+                        bucket.interactive_waiting -= 1
+
+    # --- Scheduling ---
+    def _acquire(self, learner: str, priority: int, weight: float, deadline: float) -> float:
+        """Waits for a free slot; returns the time spent queued."""
+        queued_at = time.monotonic()
+        with self._lock:
+            if self._running < self.max_concurrent and not self._queue:
+                self._running += 1
+                return 0.0
+            # Weighted fair queuing: each learner's calls get successive virtual finish tags
+            start = max(self._virtual_time, self._last_finish.get(learner, 0.0))
+            finish = start + 1.0 / weight
+            self._last_finish[learner] = finish
+            ticket = _Ticket()
+            heapq.heappush(self._queue, (priority, finish, next(self._seq), ticket))
+
+        timeout = None if deadline == math.inf else max(0.0, deadline - queued_at)
+        if ticket.event.wait(timeout=timeout):
+            return time.monotonic() - queued_at
+
+        with self._lock:
+            if ticket.event.is_set():
+                return time.monotonic() - queued_at
+            ticket.abandoned = True
+            self._metrics[PRIORITY_NAMES[priority]]["rejected"] += 1
+            retry_after = self._estimated_wait()
+        raise RateLimited(retry_after, "The LLM queue is full, please retry shortly.")
+
+    def _release(self):
+        with self._lock:
+            while self._queue:
+                _, finish, _, ticket = heapq.heappop(self._queue)
+                if not ticket.abandoned:
+                    self._virtual_time = finish
+                    ticket.event.set()
+                    return
+            self._running -= 1
+
+    def _estimated_wait(self) -> float:
+        service = sum(self._service_times) / len(self._service_times) if self._service_times else 1.0
+        return max(1.0, service * (len(self._queue) + 1) / self.max_concurrent)
+
+    def _deadline(self, priority: int) -> float:
+        return math.inf if priority >= BATCH else time.monotonic() + self.max_wait
+
+    def admit(self, learner: str = "anonymous", route: str = "default", priority: int = INTERACTIVE):
+        """
+        Takes one token for a unit of work that makes several LLM calls, which
+        then pass `admitted=True`. Raises RateLimited like `call()`.
+        """
+        self._admit(learner, route, priority, self._deadline(priority))
+
+    def call(self, fn, *args, learner: str = "anonymous", route: str = "default",
+             priority: int = INTERACTIVE, weight: float = 1.0, admitted: bool = False, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` once admitted and scheduled; raises RateLimited if refused.
+        With `admitted=True` the call skips the token buckets and only waits for a slot.
+        """
+        deadline = self._deadline(priority)
+        if not admitted:
+            self._admit(learner, route, priority, deadline)
+        queue_time = self._acquire(learner, priority, weight, deadline)
+        metrics = self._metrics[PRIORITY_NAMES[priority]]
+        started = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                metrics["admitted"] += 1
+                metrics["queue_times"].append(queue_time)
+                self._service_times.append(time.monotonic() - started)
+            self._release()
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            report = {"running": self._running, "queued": len(self._queue)}
+            for name, metrics in self._metrics.items():
+                times = sorted(metrics["queue_times"])
+                report[name] = {
+                    "admitted": metrics["admitted"],
+                    "rejected": metrics["rejected"],
+                    "queue_ms_mean": round(1000 * sum(times) / len(times), 1) if times else 0.0,
+                    "queue_ms_p95": round(1000 * times[int(0.95 * (len(times) - 1))], 1) if times else 0.0,
+                    "queue_ms_max": round(1000 * times[-1], 1) if times else 0.0,
+                }
+            return report
+
+
+# =========================
+# Flask integration
+# =========================
+def learner_id(req) -> str:
+    """
+    The signed-in learner, else the client address. Never a client-supplied
+    header, which would give a fresh bucket per request or drain someone else's.
+    """
+    from flask import session
+    return session.get("learner_id") or req.remote_addr or "anonymous"
+
+
+def install_scheduler(app, scheduler: LLMScheduler, metrics_url: str = "/scheduler/metrics"):
+    """Turns RateLimited into 429 + Retry-After and exposes queue metrics."""
+    from flask import jsonify
+
+    @app.errorhandler(RateLimited)
+    def _rate_limited(e):
+        response = jsonify({"error": e.reason, "retry_after": round(e.retry_after, 1)})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+        return response
+
+    app.add_url_rule(metrics_url, "scheduler_metrics", lambda: jsonify(scheduler.get_metrics()))
+    return scheduler
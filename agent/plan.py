@@ -1,7 +1,245 @@
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
 import random
-import time # Still useful for simulating a brief delay if desired, though less critical for GUI
+from datetime import date
+
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+# Days on which the learner reports one of these moods get a lighter load
+LIGHT_LOAD_MOODS = {"sadness", "fear", "anger", "disgust"}
+
+
+MATHEMATICS = "Mathematics"
+# Most subjects shown on a light day; the rest are postponed, not dropped
+LIGHT_DAY_SUBJECTS = 2
+
+
+class StudyPlanner:
+    """
+    A 1-week plan that can be changed in place. Each day holds sessions
+    (dicts with subject, origin day and done flag); the activity lists are
+    rendered from them. `apply()` takes deltas such as a mood or an
+    unavailable day, re-plans only the days they touch and returns the
+    days whose activities changed. Completed sessions are never moved.
+    """
+    def __init__(self, subjects, rng=random, moods=None):
+        self.rng = rng
+        self.subjects = list(subjects)
+        self.moods = dict(moods or {})
+        self.unavailable = set()
+        self.version = 0
+        self.days = self._assign(self.subjects)
+        self.rendered = {day: self.render_day(day) for day in DAYS_OF_WEEK}
+
+    def _assign(self, subjects):
+        days = {}
+        subject_index = 0
+
+        # Create a copy of subjects to shuffle for better distribution
+        shuffled_subjects = subjects[:]
+        self.rng.shuffle(shuffled_subjects)
+
+        for day in DAYS_OF_WEEK:
+            # Always include Mathematics
+            sessions = [self._session(MATHEMATICS, day)]
+
+            # Distribute other subjects
+            # Aim for 2-3 subjects per day if possible (1-2 on a light day), cycling through them
+            low, high = (1, 2) if self._light(day) else (2, 3)
+            num_subjects_today = self.rng.randint(min(low, len(shuffled_subjects)), min(high, len(shuffled_subjects)))
+            for _ in range(num_subjects_today):
+                if subject_index >= len(shuffled_subjects):
+                    subject_index = 0 # Loop back to the start if all subjects have been covered
+                    self.rng.shuffle(shuffled_subjects) # Reshuffle for variety
+                sessions.append(self._session(shuffled_subjects[subject_index], day))
+                subject_index += 1
+            days[day] = sessions
+        return days
+
+    @staticmethod
+    def _session(subject, origin):
+        return {"subject": subject, "origin": origin, "done": False}
+
+    def _light(self, day):
+        return self.moods.get(day) in LIGHT_LOAD_MOODS
+
+    def _movable(self, day):
+        return [s for s in self.days[day] if s["subject"] != MATHEMATICS and not s["done"]]
+
+    def _open_days(self, after=None):
+        """Available days, only those later in the week than `after` if given (earlier days may be past)."""
+        days = DAYS_OF_WEEK
+        if after is not None:
+            days = DAYS_OF_WEEK[DAYS_OF_WEEK.index(after) + 1:]
+        return [day for day in days if day not in self.unavailable]
+
+    # --- Rendering ---
+    def render_day(self, day):
+        light_day = self._light(day)
+        activities = []
+        if day in self.unavailable:
+            activities += [f"✅ {s['subject']} (done)" for s in self.days[day] if s["done"]]
+            # Sessions with no later open day this week to move to
+            activities += [f"⏸️ {s['subject']} (postponed, no later day free this week)" for s in self._movable(day)]
+            return activities + ["🚫 Not available today (sessions moved to other days)"]
+
+        shown = 0
+        for session in self.days[day]:
+            done = "✅ " if session["done"] else ""
+            if session["subject"] == MATHEMATICS:
+                activities.append(f"{done}🧠 Mathematics (1 hour)" if light_day else f"{done}🧠 Mathematics (1.5 hours)")
+                continue
+            if light_day and not session["done"] and shown >= LIGHT_DAY_SUBJECTS:
+                activities.append(f"⏸️ {session['subject']} (postponed, lighter day)")
+                continue
+            shown += 1
+            duration = "1 hour" if light_day else "1.5-2 hours"
+            moved = f", moved from {session['origin']}" if session["origin"] != day else ""
+            activities.append(f"{done}📖 {session['subject']} ({duration}{moved})")
+
+        if light_day:
+            activities.append("🌿 Wellbeing check-in (15 minutes)")
+
+        # Always include Playtime
+        activities.append("🎮 Playtime / Break (1 hour)")
+
+        # Add a little extra flexibility for the weekend
+        if day in ["Saturday", "Sunday"]:
+            activities.append("🧘 Free Study / Hobby Time (flexible)")
+        return activities
+
+    def to_dict(self):
+        return {day: list(self.rendered[day]) for day in DAYS_OF_WEEK}
+
+    # --- Deltas ---
+    def apply(self, deltas):
+        """
+        Applies a list of deltas and returns {"version", "changed": {day: activities}}.
+        Raises ValueError (or KeyError for a missing field) and leaves the
+        plan unchanged if any delta is invalid.
+        """
+        saved = ({day: [dict(s) for s in sessions] for day, sessions in self.days.items()},
+                 dict(self.moods), set(self.unavailable), list(self.subjects))
+        touched = set()
+        try:
+            for delta in deltas:
+                handler = getattr(self, f"_apply_{delta.get('type')}", None)
+                if handler is None:
+                    raise ValueError(f"Unknown delta type: {delta.get('type')!r}")
+                day = delta.get("day")
+                if day is not None and day not in DAYS_OF_WEEK:
+                    raise ValueError(f"Unknown day: {day!r}")
+                touched |= handler(delta)
+        except (ValueError, KeyError):
+            self.days, self.moods, self.unavailable, self.subjects = saved
+            raise
+
+        changed = {}
+        for day in DAYS_OF_WEEK:
+            if day in touched:
+                activities = self.render_day(day)
+                if activities != self.rendered[day]:
+                    self.rendered[day] = changed[day] = activities
+        if changed:
+            self.version += 1
+        return {"version": self.version, "changed": changed}
+
+    def _apply_mood(self, delta):
+        day = delta["day"]
+        if delta.get("mood") is not None and not isinstance(delta["mood"], str):
+            raise ValueError(f"Mood must be a string: {delta['mood']!r}")
+        if delta.get("mood"):
+            self.moods[day] = delta["mood"]
+        else:
+            self.moods.pop(day, None)
+        return {day}
+
+    def _apply_unavailable(self, delta):
+        day = delta["day"]
+        if day in self.unavailable:
+            return set()
+        self.unavailable.add(day)
+        touched = {day}
+        receivers = self._open_days(after=day)
+        # Remember each session's position, so it goes back to the same place when the day is available again
+        for slot, session in enumerate(self.days[day]):
+            if session["origin"] == day:
+                session["slot"] = slot
+        for session in self._movable(day):
+            if not receivers:
+                break
+            # The least loaded open day, preferring days without this subject yet and normal-load days
+            target = min(receivers, key=lambda d: (
+                any(s["subject"] == session["subject"] for s in self.days[d]), self._light(d), len(self._movable(d))))
+            self.days[day].remove(session)
+            self.days[target].append(session)
+            touched.add(target)
+        return touched
+
+    def _apply_available(self, delta):
+        day = delta["day"]
+        if day not in self.unavailable:
+            return set()
+        self.unavailable.discard(day)
+        touched = {day}
+        returning = []
+        for other in DAYS_OF_WEEK:
+            if other == day:
+                continue
+            for session in [s for s in self._movable(other) if s["origin"] == day]:
+                self.days[other].remove(session)
+                returning.append(session)
+                touched.add(other)
+        # Back into their original places, in ascending order so earlier slots are filled first
+        for session in sorted(returning, key=lambda s: s["slot"]):
+            self.days[day].insert(session["slot"], session)
+        return touched
+
+    def _apply_subject_added(self, delta):
+        subject = delta["subject"]
+        if subject in self.subjects:
+            return set()
+        pending = sum(len(self._movable(day)) for day in DAYS_OF_WEEK)
+        # As many sessions as an average existing subject gets
+        count = max(1, round(pending / len(self.subjects))) if self.subjects else 2
+        self.subjects.append(subject)
+        open_days = sorted(self._open_days(), key=lambda d: (self._light(d), len(self._movable(d)), DAYS_OF_WEEK.index(d)))
+        touched = set(open_days[:count])
+        for day in touched:
+            self.days[day].append(self._session(subject, day))
+        return touched
+
+    def _apply_subject_removed(self, delta):
+        subject = delta["subject"]
+        if subject not in self.subjects:
+            raise ValueError(f"Unknown subject: {subject!r}")
+        self.subjects.remove(subject)
+        touched = set()
+        for day in DAYS_OF_WEEK:
+            keep = [s for s in self.days[day] if s["subject"] != subject or s["done"]]
+            if len(keep) != len(self.days[day]):
+                self.days[day] = keep
+                touched.add(day)
+        return touched
+
+    def _apply_completed(self, delta):
+        day, subject = delta["day"], delta["subject"]
+        for session in self.days[day]:
+            if session["subject"] == subject and not session["done"]:
+                session["done"] = True
+                return {day}
+        raise ValueError(f"No open {subject} session on {day}")
+
+
+def build_study_plan(subjects, rng=random, moods=None):
+    """
+    Builds a 1-week plan dict of day -> activities for the given subjects.
+    `moods` optionally maps a day to the learner's detected emotion.
+    Kept free of Tkinter so the server and job workers can call it.
+    """
+    return StudyPlanner(subjects, rng, moods).to_dict()
+
 
 class StudyAgentApp:
     def __init__(self, master):
@@ -12,6 +250,7 @@ class StudyAgentApp:
         master.configure(bg="#e0f7fa") # Light blue background
 
         self.subjects = []
+        self.planner = None
 
         # --- Header ---
         self.header_frame = tk.Frame(master, bg="#00796b", pady=10)
@@ -58,6 +297,26 @@ class StudyAgentApp:
                                          relief="raised", bd=5, cursor="hand2")
         self.generate_button.pack(pady=20)
 
+        # --- Replan Section: changes are applied to the current plan in place ---
+        self.replan_frame = tk.Frame(master, bg="#b2dfdb", padx=15, pady=10, bd=2, relief="groove")
+        self.replan_frame.pack(padx=20, fill="x")
+
+        self.day_var = tk.StringVar(value=date.today().strftime("%A"))
+        tk.OptionMenu(self.replan_frame, self.day_var, *DAYS_OF_WEEK).grid(row=0, column=0, padx=5, pady=5)
+        self.mood_var = tk.StringVar(value="neutral")
+        tk.OptionMenu(self.replan_frame, self.mood_var,
+                      "neutral", "joy", "surprise", "sadness", "fear", "anger", "disgust").grid(row=0, column=1, padx=5, pady=5)
+
+        for column, (text, command) in enumerate([
+            ("Set Mood", self.set_mood),
+            ("Day Unavailable", lambda: self.apply_delta({"type": "unavailable", "day": self.day_var.get()})),
+            ("Day Available", lambda: self.apply_delta({"type": "available", "day": self.day_var.get()})),
+            ("Mark Entered Subject Done", self.mark_done),
+        ], start=2):
+            tk.Button(self.replan_frame, text=text, command=command, font=("Arial", 10), bg="#00796b", fg="white",
+                      activebackground="#00897b", activeforeground="white", relief="raised", bd=3,
+                      cursor="hand2").grid(row=0, column=column, padx=5, pady=5)
+
         # --- Study Plan Output Section ---
         self.plan_frame = tk.Frame(master, bg="#e0f2f7", padx=15, pady=15, bd=2, relief="sunken")
         self.plan_frame.pack(pady=10, padx=20, fill="both", expand=True)
@@ -83,6 +342,8 @@ class StudyAgentApp:
                 self.subjects.append(subject.capitalize())
                 self.subject_entry.delete(0, tk.END)
                 self.update_subjects_display()
+                if self.planner:
+                    self.apply_delta({"type": "subject_added", "subject": subject.capitalize()})
             else:
                 messagebox.showwarning("Duplicate Subject", f"'{subject.capitalize()}' is already in your list.")
         else:
@@ -91,6 +352,7 @@ class StudyAgentApp:
     def clear_subjects(self):
         if messagebox.askyesno("Clear Subjects", "Are you sure you want to clear all subjects?"):
             self.subjects = []
+            self.planner = None
             self.update_subjects_display()
             self.plan_display.config(state="normal")
             self.plan_display.delete(1.0, tk.END)
@@ -114,73 +376,60 @@ class StudyAgentApp:
             messagebox.showerror("No Subjects", "Please add at least one subject before generating the plan.")
             return None
 
-        days_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        plan = {}
-        subject_index = 0
-
-        # Create a copy of subjects to shuffle for better distribution
-        shuffled_subjects = self.subjects[:]
-        random.shuffle(shuffled_subjects)
-
-        for day in days_of_week:
-            daily_plan = []
-
-            # Always include Mathematics
-            daily_plan.append("🧠 Mathematics (1.5 hours)")
-
-            # Distribute other subjects
-            # Aim for 2-3 subjects per day if possible, cycling through them
-            num_subjects_today = random.randint(2, min(3, len(shuffled_subjects)))
-            for _ in range(num_subjects_today):
-                if subject_index >= len(shuffled_subjects):
-                    subject_index = 0 # Loop back to the start if all subjects have been covered
-                    random.shuffle(shuffled_subjects) # Reshuffle for variety
-                daily_plan.append(f"📖 {shuffled_subjects[subject_index]} (1.5-2 hours)")
-                subject_index += 1
-
-            # Always include Playtime
-            daily_plan.append("🎮 Playtime / Break (1 hour)")
-
-            # Add a little extra flexibility for the weekend
-            if day in ["Saturday", "Sunday"]:
-                daily_plan.append("🧘 Free Study / Hobby Time (flexible)")
-
-            plan[day] = daily_plan
-        return plan
+        self.planner = StudyPlanner(self.subjects)
+        return self.planner.to_dict()
 
     def generate_and_display_plan(self):
+        study_plan = self.generate_study_plan()
         self.plan_display.config(state="normal")
         self.plan_display.delete(1.0, tk.END)
-        self.plan_display.insert(tk.END, "⏳ Generating your personalized study plan...\n\n")
-        self.plan_display.config(state="disabled")
-        self.master.update_idletasks() # Update GUI to show loading message
-
-        # Simulate a small delay for user experience
-        time.sleep(1)
-
-        study_plan = self.generate_study_plan()
         if study_plan:
-            self.plan_display.config(state="normal")
-            self.plan_display.delete(1.0, tk.END) # Clear loading message
-
             self.plan_display.insert(tk.END, "✨ Your 1-Week Study Master Plan! ✨\n")
             self.plan_display.insert(tk.END, "------------------------------------\n\n")
 
+            # Each day's block is tagged so a replan can swap just that block
             for day, activities in study_plan.items():
-                self.plan_display.insert(tk.END, f"🗓️ {day}:\n")
-                for activity in activities:
-                    self.plan_display.insert(tk.END, f"  - {activity}\n")
-                self.plan_display.insert(tk.END, "-" * 20 + "\n\n")
+                self.plan_display.insert(tk.END, self.format_day(day, activities), f"day-{day}")
 
             self.plan_display.insert(tk.END, "Good luck with your studies! Remember to stay consistent and take breaks! 🚀\n")
             self.plan_display.insert(tk.END, "------------------------------------\n")
-            self.plan_display.config(state="disabled")
-        else:
-            # If generate_study_plan returned None (due to no subjects),
-            # the messagebox already handled the error. Just clear any loading text.
-            self.plan_display.config(state="normal")
-            self.plan_display.delete(1.0, tk.END)
-            self.plan_display.config(state="disabled")
+        # If generate_study_plan returned None (due to no subjects),
+        # the messagebox already handled the error and the display stays empty.
+        self.plan_display.config(state="disabled")
+
+    @staticmethod
+    def format_day(day, activities):
+        lines = [f"🗓️ {day}:\n"] + [f"  - {activity}\n" for activity in activities]
+        return "".join(lines) + "-" * 20 + "\n\n"
+
+    def apply_delta(self, delta):
+        """Re-plans the current plan for one change and redraws only the days that changed."""
+        if not self.planner:
+            messagebox.showwarning("No Plan", "Generate a plan first, then adjust it.")
+            return
+        try:
+            diff = self.planner.apply([delta])
+        except ValueError as e:
+            messagebox.showerror("Can't Update Plan", str(e))
+            return
+        self.plan_display.config(state="normal")
+        for day, activities in diff["changed"].items():
+            start, end = self.plan_display.tag_ranges(f"day-{day}")
+            self.plan_display.delete(start, end)
+            self.plan_display.insert(start, self.format_day(day, activities), f"day-{day}")
+        self.plan_display.config(state="disabled")
+
+    def set_mood(self):
+        mood = self.mood_var.get()
+        self.apply_delta({"type": "mood", "day": self.day_var.get(), "mood": None if mood == "neutral" else mood})
+
+    def mark_done(self):
+        subject = self.subject_entry.get().strip()
+        if not subject:
+            messagebox.showwarning("Empty Subject", "Enter the subject you finished in the subject box.")
+            return
+        self.apply_delta({"type": "completed", "day": self.day_var.get(),
+                          "subject": MATHEMATICS if subject.lower() in ("math", "maths") else subject.capitalize()})
 
 
 def main():
@@ -0,0 +1,270 @@
+# Profiler hooks for live agent processes
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Collects profiles from a running agent without restarting it.
+
+    Two modes can be switched on at runtime:
+    - request mode wraps a fraction of requests (or every request for a
+      time window) in cProfile and aggregates them into one pstats report.
+    - sample mode walks every thread's stack at a fixed interval and
+      counts collapsed stacks, ready for flamegraph.pl or speedscope.
+    """
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._stats = None
+        self._sampler = None
+        self.request_fraction = 0.0
+        self.requests_until = 0.0
+        self.profiled_requests = 0
+        self.skipped_requests = 0
+
+    # --- Request mode ---
+    def enable_requests(self, fraction: float = 1.0, seconds: float = 0.0):
+        """Profile `fraction` of requests, or every request for `seconds`."""
+        with self._lock:
+            self.request_fraction = max(0.0, min(1.0, fraction))
+            self.requests_until = time.monotonic() + seconds if seconds > 0 else 0.0
+
+    def disable_requests(self):
+        with self._lock:
+            self.request_fraction = 0.0
+            self.requests_until = 0.0
+
+    def should_profile_request(self) -> bool:
+        if self.requests_until and time.monotonic() < self.requests_until:
+            return True
+        return self.request_fraction > 0 and random.random() < self.request_fraction
+
+    def start_request(self):
+        """Returns an enabled cProfile.Profile, or None if another profiler is already active."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except (ValueError, RuntimeError):
+            # Python 3.12+: one profiler per process ("Another profiling tool is already active"),
+            # e.g. a concurrent profiled request. Profiling must never fail the request itself.
+            with self._lock:
+                self.skipped_requests += 1
+            return None
+        return profile
+
+    def finish_request(self, profile):
+        profile.disable()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.profiled_requests += 1
+
+    # --- Sample mode ---
+    @property
+    def sampling(self) -> bool:
+        return self._sampler is not None and self._sampler.is_alive()
+
+    def start_sampling(self, seconds: float, on_done=None) -> bool:
+        """Sample all thread stacks for `seconds`. Returns False if already running."""
+        if self.sampling:
+            return False
+        deadline = time.monotonic() + seconds
+        self._sampler = threading.Thread(
+            target=self._sample_until, args=(deadline, on_done),
+            name="profiler-sampler", daemon=True
+        )
+        self._sampler.start()
+        return True
+
+    def _sample_until(self, deadline: float, on_done):
+        own_id = threading.get_ident()
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            batch = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                batch.append(";".join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(batch)
+            time.sleep(self.interval)
+        if on_done is not None:
+            on_done(self)
+
+    # --- Reports ---
+    def collapsed(self) -> str:
+        """Return sampled stacks in the collapsed `frame;frame count` format."""
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def pstats_report(self, sort: str = "cumulative", limit: int = 50) -> str:
+        with self._lock:
+            if self._stats is None:
+                return "No requests profiled yet.\n"
+            out = io.StringIO()
+            self._stats.stream = out
+            self._stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def status(self) -> dict:
+        with self._lock:
+            remaining = max(0.0, self.requests_until - time.monotonic()) if self.requests_until else 0.0
+            return {
+                "request_fraction": self.request_fraction,
+                "requests_window_remaining": round(remaining, 3),
+                "profiled_requests": self.profiled_requests,
+                "skipped_requests": self.skipped_requests,
+                "sampling": self.sampling,
+                "sampled_stacks": sum(self._stacks.values()),
+            }
+
+    def clear_stacks(self):
+        with self._lock:
+            self._stacks.clear()
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._stats = None
+            self.profiled_requests = 0
+            self.skipped_requests = 0
+
+
+# =========================
+# Flask integration
+# =========================
+ADMIN_TOKEN_ENV = "NEUROBRIDGE_ADMIN_TOKEN"
+
+
+def _is_admin(req) -> bool:
+    expected = os.getenv(ADMIN_TOKEN_ENV)
+    if not expected:
+        return False
+    supplied = req.headers.get("X-Admin-Token", "")
+    auth = req.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        supplied = auth[len("Bearer "):]
+    return hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+def install_profiler(app, profiler: SamplingProfiler = None, url: str = "/admin/profile") -> SamplingProfiler:
+    """
+    Attach request profiling and the admin endpoint to a Flask app.
+
+    POST   {url}  {"mode": "requests", "fraction": 0.1} or {"mode": "requests", "seconds": 30}
+                  {"mode": "sample", "seconds": 30}
+    GET    {url}?format=status|pstats|collapsed
+    DELETE {url}  stop request profiling and clear collected data
+
+    The endpoint is disabled unless NEUROBRIDGE_ADMIN_TOKEN is set, and every
+    call must send it as `X-Admin-Token` or `Authorization: Bearer`.
+    """
+    from flask import Response, g, jsonify, request
+
+    profiler = profiler or SamplingProfiler()
+
+    @app.before_request
+    def _start_request_profile():
+        if request.path != url and profiler.should_profile_request():
+            g._request_profile = profiler.start_request()
+
+    @app.teardown_request
+    def _finish_request_profile(exc=None):
+        profile = g.pop("_request_profile", None)
+        if profile is not None:
+            profiler.finish_request(profile)
+
+    def admin_profile():
+        if not _is_admin(request):
+            return jsonify({"error": "Not authorized."}), 403
+
+        if request.method == "GET":
+            fmt = request.args.get("format", "status")
+            if fmt == "collapsed":
+                return Response(profiler.collapsed(), mimetype="text/plain",
+                                headers={"Content-Disposition": "attachment; filename=profile.collapsed"})
+            if fmt == "pstats":
+                sort = request.args.get("sort", "cumulative")
+                limit = int(request.args.get("limit", 50))
+                return Response(profiler.pstats_report(sort, limit), mimetype="text/plain")
+            return jsonify(profiler.status())
+
+        if request.method == "DELETE":
+            profiler.disable_requests()
+            profiler.reset()
+            return jsonify(profiler.status())
+
+        data = request.get_json(silent=True) or {}
+        mode = data.get("mode", "requests")
+        seconds = float(data.get("seconds", 0))
+        if mode == "sample":
+            if seconds <= 0:
+                return jsonify({"error": "Sample mode needs a positive 'seconds'."}), 400
+            if not profiler.start_sampling(seconds):
+                return jsonify({"error": "A sampling run is already in progress."}), 409
+        elif mode == "requests":
+            profiler.enable_requests(float(data.get("fraction", 0.0 if seconds else 1.0)), seconds)
+        else:
+            return jsonify({"error": f"Unknown mode: {mode}"}), 400
+        return jsonify(profiler.status()), 202
+
+    app.add_url_rule(url, "admin_profile", admin_profile, methods=["GET", "POST", "DELETE"])
+    return profiler
+
+
+# =========================
+# Signal integration
+# =========================
+def install_signal_handler(profiler: SamplingProfiler = None, seconds: float = None,
+                           output_dir: str = None) -> SamplingProfiler:
+    """
+    Start a sampling run when the process receives SIGUSR1.
+
+    Useful for agents without an HTTP admin surface (Gradio, Tkinter). When the
+    run finishes, the collapsed stacks are written to
+    `<output_dir>/neurobridge-<pid>-<timestamp>.collapsed`.
+    """
+    profiler = profiler or SamplingProfiler()
+    sig = getattr(signal, "SIGUSR1", None)
+    if sig is None or threading.current_thread() is not threading.main_thread():
+        return profiler
+
+    seconds = seconds or float(os.getenv("NEUROBRIDGE_PROFILE_SECONDS", 30))
+    output_dir = output_dir or os.getenv("NEUROBRIDGE_PROFILE_DIR", tempfile.gettempdir())
+
+    def _write_profile(p):
+        path = os.path.join(output_dir, f"neurobridge-{os.getpid()}-{int(time.time())}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(p.collapsed())
+        # Only the sampled stacks were written; request profiles stay for /admin/profile
+        p.clear_stacks()
+        print(f"Profile written to {path}", file=sys.stderr)
+
+    def _handler(signum, frame):
+        if profiler.start_sampling(seconds, on_done=_write_profile):
+            print(f"Sampling stacks for {seconds:g}s...", file=sys.stderr)
+
+    signal.signal(sig, _handler)
+    return profiler
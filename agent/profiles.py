@@ -0,0 +1,258 @@
+# Encrypted learner profile store
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+NONCE_SIZE = 12
+
+
+class PasswordHasher:
+    """
+    Salted scrypt password hashing. The cost parameters are stored with each
+    hash, so raising `n` later only affects new and re-hashed passwords.
+    """
+    def __init__(self, n: int = 2 ** 15, r: int = 8, p: int = 1):
+        self.n, self.r, self.p = n, r, p
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r, dklen=32)
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return "$".join(["scrypt", str(self.n), str(self.r), str(self.p),
+                         base64.b64encode(salt).decode(), base64.b64encode(digest).decode()])
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            _, n, r, p, salt, digest = encoded.split("$")
+            expected = base64.b64decode(digest)
+            actual = self._derive(password, base64.b64decode(salt), int(n), int(r), int(p))
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return encoded.split("$")[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+
+def _read_or_create_key(path: str, generate, env_name: str) -> bytes:
+    """Reads a base64 key from `path`, generating it first if missing. Safe for concurrent workers."""
+    if not os.path.exists(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # another worker created it first
+        else:
+            print(f"{env_name} not set; generating a local key at {path}", file=sys.stderr)
+            with os.fdopen(fd, "w") as f:
+                f.write(base64.b64encode(generate()).decode())
+    for _ in range(50):
+        with open(path) as f:
+            encoded = f.read().strip()
+        if encoded:
+            return base64.b64decode(encoded)
+        time.sleep(0.01)  # created by another worker but not written yet
+    raise ValueError(f"Key file {path} is empty")
+
+
+def load_master_key(path: str) -> bytes:
+    """
+    Returns the 32-byte key-encryption key. NEUROBRIDGE_MASTER_KEY (base64)
+    wins; otherwise the key is read from, or generated into, `path`.
+    """
+    encoded = os.getenv("NEUROBRIDGE_MASTER_KEY")
+    if encoded:
+        return base64.b64decode(encoded)
+    return _read_or_create_key(path, lambda: AESGCM.generate_key(bit_length=256), "NEUROBRIDGE_MASTER_KEY")
+
+
+def load_secret_key(path: str) -> bytes:
+    """
+    Returns the Flask session signing key. FLASK_SECRET_KEY wins; otherwise
+    the key is kept in `path`, so sessions survive restarts and every
+    worker process signs them with the same key.
+    """
+    secret = os.getenv("FLASK_SECRET_KEY")
+    if secret:
+        return secret.encode()
+    return _read_or_create_key(path, lambda: secrets.token_bytes(32), "FLASK_SECRET_KEY")
+
+
+def _seal(key: AESGCM, plaintext: bytes, aad: bytes) -> bytes:
+    nonce = secrets.token_bytes(NONCE_SIZE)
+    return nonce + key.encrypt(nonce, plaintext, aad)
+
+
+def _open(key: AESGCM, sealed: bytes, aad: bytes) -> bytes:
+    return key.decrypt(sealed[:NONCE_SIZE], sealed[NONCE_SIZE:], aad)
+
+
+class LearnerProfile:
+    """
+    A learner's profile with its data key already unwrapped. Field values
+    stay encrypted until first read; each field is decrypted once.
+    """
+    def __init__(self, learner_id: str, data_key: AESGCM, sealed_fields: dict):
+        self.learner_id = learner_id
+        self._data_key = data_key
+        self._sealed = sealed_fields
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def fields(self) -> list:
+        return list(self._sealed)
+
+    def get(self, field: str, default=None):
+        with self._lock:
+            if field in self._values:
+                return self._values[field]
+            sealed = self._sealed.get(field)
+            if sealed is None:
+                return default
+            aad = f"{self.learner_id}:{field}".encode()
+            value = json.loads(_open(self._data_key, sealed, aad))
+            self._values[field] = value
+            return value
+
+    def __getitem__(self, field: str):
+        value = self.get(field, KeyError)
+        if value is KeyError:
+            raise KeyError(field)
+        return value
+
+    def to_dict(self, fields=None) -> dict:
+        return {field: self.get(field) for field in (fields or self.fields()) if field in self._sealed}
+
+    def _replace(self, field: str, sealed: bytes):
+        with self._lock:
+            self._sealed[field] = sealed
+            self._values.pop(field, None)
+
+
+class ProfileStore:
+    """
+    Learner accounts and profiles in SQLite, with envelope encryption.
+
+    Each learner has a random data key, stored wrapped by the master key.
+    Every profile field is sealed separately with the data key (AES-GCM,
+    bound to learner ID and field name). Recently used profiles are kept
+    in a bounded LRU cache with their data key unwrapped.
+    """
+    def __init__(self, path: str, master_key: bytes, cache_size: int = 256,
+                 hasher: PasswordHasher = None):
+        self._master = AESGCM(master_key)
+        self.hasher = hasher or PasswordHasher()
+        self.cache_size = cache_size
+        # Checked for unknown emails, so a failed sign-in takes as long whether or not the account exists
+        self._dummy_hash = self.hasher.hash(secrets.token_urlsafe(16))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS learners (
+                learner_id TEXT PRIMARY KEY,
+                email TEXT NOT NULL UNIQUE,
+                password_hash TEXT NOT NULL,
+                wrapped_key BLOB NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS profile_fields (
+                learner_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                sealed BLOB NOT NULL,
+                PRIMARY KEY (learner_id, field)
+            ) WITHOUT ROWID
+        """)
+
+    # --- Accounts ---
+    def register(self, email: str, password: str, fields: dict = None) -> str:
+        """Creates a learner and returns its ID. Raises ValueError if the email is taken."""
+        learner_id = uuid.uuid4().hex
+        data_key = AESGCM.generate_key(bit_length=256)
+        wrapped = _seal(self._master, data_key, learner_id.encode())
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO learners (learner_id, email, password_hash, wrapped_key, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (learner_id, email.strip().lower(), self.hasher.hash(password), wrapped, time.time())
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError("An account with this email already exists.")
+        if fields:
+            self.set_fields(learner_id, fields)
+        return learner_id
+
+    def authenticate(self, email: str, password: str) -> str:
+        """Returns the learner ID for valid credentials, otherwise None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT learner_id, password_hash FROM learners WHERE email = ?", (email.strip().lower(),)
+            ).fetchone()
+        if row is None:
+            self.hasher.verify(password, self._dummy_hash)
+            return None
+        if not self.hasher.verify(password, row[1]):
+            return None
+        if self.hasher.needs_rehash(row[1]):
+            with self._lock:
+                self._conn.execute("UPDATE learners SET password_hash = ? WHERE learner_id = ?",
+                                   (self.hasher.hash(password), row[0]))
+        return row[0]
+
+    # --- Profiles ---
+    def profile(self, learner_id: str) -> LearnerProfile:
+        """Returns the learner's profile, from cache when hot. None if unknown."""
+        with self._lock:
+            cached = self._cache.get(learner_id)
+            if cached is not None:
+                self._cache.move_to_end(learner_id)
+                return cached
+            row = self._conn.execute(
+                "SELECT wrapped_key FROM learners WHERE learner_id = ?", (learner_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            sealed = dict(self._conn.execute(
+                "SELECT field, sealed FROM profile_fields WHERE learner_id = ?", (learner_id,)
+            ).fetchall())
+
+        data_key = AESGCM(_open(self._master, row[0], learner_id.encode()))
+        profile = LearnerProfile(learner_id, data_key, sealed)
+        with self._lock:
+            self._cache[learner_id] = profile
+            self._cache.move_to_end(learner_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return profile
+
+    def set_fields(self, learner_id: str, fields: dict):
+        profile = self.profile(learner_id)
+        if profile is None:
+            raise KeyError(learner_id)
+        rows = []
+        for field, value in fields.items():
+            aad = f"{learner_id}:{field}".encode()
+            rows.append((learner_id, field, _seal(profile._data_key, json.dumps(value).encode(), aad)))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO profile_fields (learner_id, field, sealed) VALUES (?, ?, ?)", rows
+            )
+        for _, field, sealed in rows:
+            profile._replace(field, sealed)
@@ -0,0 +1,60 @@
+# Readability scoring (Flesch reading ease, Flesch-Kincaid grade)
+import re
+from functools import lru_cache
+
+_WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+_SENTENCE_RE = re.compile(r"[^.!?\n]*[A-Za-z][^.!?\n]*(?:[.!?]+|\n|$)")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]{1,2}")
+_SILENT_ENDING_RE = re.compile(r"(?:[^laeiouy]es|[^td]ed|[^laeiouy]e)$")
+
+
+@lru_cache(maxsize=65536)
+def count_syllables(word: str) -> int:
+    """Estimates syllables in an English word from its vowel groups."""
+    word = word.lower().replace("'", "")
+    if len(word) <= 3:
+        return 1
+    word = _SILENT_ENDING_RE.sub("", word)
+    if word.startswith("y"):
+        word = word[1:]
+    return max(1, len(_VOWEL_GROUP_RE.findall(word)))
+
+
+def text_stats(text: str) -> dict:
+    """Counts sentences, words, syllables and polysyllabic (3+) words."""
+    words = _WORD_RE.findall(text)
+    syllables = [count_syllables(word) for word in words]
+    return {
+        "sentences": max(1, len(_SENTENCE_RE.findall(text))) if words else 0,
+        "words": len(words),
+        "syllables": sum(syllables),
+        "polysyllables": sum(1 for count in syllables if count >= 3),
+    }
+
+
+def flesch_reading_ease(stats: dict) -> float:
+    if not stats["words"]:
+        return 100.0
+    return (206.835
+            - 1.015 * stats["words"] / stats["sentences"]
+            - 84.6 * stats["syllables"] / stats["words"])
+
+
+def flesch_kincaid_grade(stats: dict) -> float:
+    if not stats["words"]:
+        return 0.0
+    return (0.39 * stats["words"] / stats["sentences"]
+            + 11.8 * stats["syllables"] / stats["words"]
+            - 15.59)
+
+
+def score_text(text: str) -> dict:
+    """Returns text statistics plus reading ease and grade level."""
+    stats = text_stats(text)
+    stats["flesch_reading_ease"] = round(flesch_reading_ease(stats), 2)
+    stats["flesch_kincaid_grade"] = round(flesch_kincaid_grade(stats), 2)
+    return stats
+
+
+def grade_level(text: str) -> float:
+    return flesch_kincaid_grade(text_stats(text))
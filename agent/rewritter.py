@@ -4,24 +4,32 @@ import subprocess
 import sys
 import time
 
+# (pip requirement, module it provides); only missing modules are installed
 required_packages = [
-    "Flask==2.2.5",
-    "flask-cors==3.0.10",
-    "google-generativeai==0.3.2"
+    ("Flask==2.2.5", "flask"),
+    ("flask-cors==3.0.10", "flask_cors"),
+    ("google-generativeai==0.3.2", "google.generativeai"),
 ]
 
-for package in required_packages:
+for package, module in required_packages:
     try:
-        __import__(package.split("==")[0].replace("-", "_"))
+        __import__(module)
     except ImportError:
         subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import google.generativeai as genai
+from jobs import JobQueue, register_job_routes
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, RateLimited, install_scheduler, learner_id
+from profiler import install_profiler, install_signal_handler
+from readability import grade_level, score_text
 
 app = Flask(__name__)
 CORS(app)
+profiler = install_profiler(app)
+install_signal_handler(profiler)
+llm_scheduler = install_scheduler(app, LLMScheduler.from_env("rewrite"))
 
 # =========================
 # Gemini API Configuration
@@ -98,7 +106,7 @@ HTML_PAGE = """
         });
 
         const data = await response.json();
-        outputText.value = data.rewritten_text || "Error occurred.";
+        outputText.value = data.rewritten_text || data.error || "Error occurred.";
       } catch (err) {
         outputText.value = "Failed to connect to server.";
       }
@@ -124,28 +132,116 @@ HTML_PAGE = """
 </html>
 """
 
+# =========================
+# Rewriting
+# =========================
+TARGET_GRADE = 6
+# Consecutive hard paragraphs are sent together up to this size
+MAX_CHUNK_CHARS = 4000
+
+
+def ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def rewrite_passage(text, target_grade=TARGET_GRADE, learner="anonymous", priority=INTERACTIVE, admitted=False):
+    """
+    Ask Gemini to rewrite one passage, retrying with exponential backoff.
+    Only the first attempt takes a rate-limit token, and none if `admitted`.
+    """
+    prompt = f"Rewrite the following passage to a {ordinal(target_grade)}-grade reading level:\n\n{text}"
+    for i in range(5):
+        try:
+            response = llm_scheduler.call(model.generate_content, prompt, learner=learner, route="rewrite",
+                                          priority=priority, admitted=admitted or i > 0)
+            return response.text
+        except RateLimited:
+            raise
+        except Exception:
+            time.sleep(2 ** i)
+    raise Exception("Max retries exceeded")
+
+
+def rewrite_to_level(text, target_grade=TARGET_GRADE, on_progress=None, learner="anonymous", priority=INTERACTIVE):
+    """
+    Rewrite only the paragraphs scoring above `target_grade`, leaving the rest
+    untouched. Returns the new text, the number of paragraphs sent to the LLM
+    and before/after readability metrics.
+
+    An interactive rewrite is admitted once for the whole document, so it
+    waits for at most one token however many parts it has. Batch jobs take
+    a token per part and wait their turn.
+    """
+    before = score_text(text)
+    paragraphs = text.split("\n\n")
+    hard = [i for i, paragraph in enumerate(paragraphs)
+            if paragraph.strip() and grade_level(paragraph) > target_grade]
+
+    # Group neighbouring hard paragraphs so long documents need fewer calls
+    runs = []
+    for i in hard:
+        if (runs and runs[-1][-1] == i - 1
+                and sum(len(paragraphs[j]) for j in runs[-1]) + len(paragraphs[i]) <= MAX_CHUNK_CHARS):
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+
+    admitted = False
+    if runs and priority == INTERACTIVE:
+        llm_scheduler.admit(learner, "rewrite", priority)
+        admitted = True
+
+    for n, run in enumerate(runs):
+        passage = "\n\n".join(paragraphs[j] for j in run)
+        paragraphs[run[0]] = rewrite_passage(passage, target_grade, learner, priority, admitted).strip()
+        for j in run[1:]:
+            paragraphs[j] = None
+        if on_progress:
+            on_progress((n + 1) / len(runs), f"Rewrote part {n + 1} of {len(runs)}")
+
+    rewritten_text = "\n\n".join(p for p in paragraphs if p is not None) if runs else text
+    return {
+        "rewritten_text": rewritten_text,
+        "skipped": not runs,
+        "rewritten_paragraphs": len(hard),
+        "total_paragraphs": sum(1 for p in text.split("\n\n") if p.strip()),
+        "target_grade": target_grade,
+        "before": before,
+        "after": score_text(rewritten_text) if runs else before,
+    }
+
+
+def rewrite_job(job, payload):
+    """Background job: rewrite a long document part by part, reporting progress."""
+    return rewrite_to_level(payload["text"], int(payload.get("target_grade", TARGET_GRADE)), job.progress,
+                            learner=job.user, priority=BATCH)
+
+
+# Long documents go through the job queue instead of one blocking request
+JOBS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rewrite_jobs.sqlite3")
+job_queue = JobQueue(os.getenv("REWRITE_JOBS_DB", JOBS_DB))
+job_queue.register("rewrite", rewrite_job)
+register_job_routes(app, job_queue)
+
 # =========================
 # Routes
 # =========================
 @app.route("/rewrite", methods=["POST"])
 def rewrite_text():
-    """Rewrite the provided text to a 6th-grade reading level."""
+    """
+    Rewrite the provided text to a 6th-grade reading level (or `target_grade`).
+    Text that already meets the target is returned as-is without an LLM call.
+    """
     data = request.get_json()
     if not data or "text" not in data:
         return jsonify({"error": "No text provided in the request body."}), 400
 
-    original_text = data["text"]
-    prompt = f"Rewrite the following passage to a 6th-grade reading level:\n\n{original_text}"
-
     try:
-        for i in range(5):
-            try:
-                response = model.generate_content(prompt)
-                rewritten_text = response.text
-                return jsonify({"rewritten_text": rewritten_text}), 200
-            except Exception:
-                time.sleep(2 ** i)
-        raise Exception("Max retries exceeded")
+        target_grade = int(data.get("target_grade", TARGET_GRADE))
+        return jsonify(rewrite_to_level(data["text"], target_grade, learner=learner_id(request))), 200
+    except RateLimited:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -160,4 +256,5 @@ def index():
 # =========================
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
+    job_queue.start()
     app.run(host="0.0.0.0", port=port)
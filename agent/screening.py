@@ -0,0 +1,123 @@
+# Cognition screening logic, shared by the Gradio app (cognition.py) and the dashboard's jobs.
+# Importing this module has no side effects: the LLM and the semantic cache
+# are created on first use, and the environment is left alone.
+import os
+import sys
+import threading
+
+from semantic_cache import DEFAULT_EMBEDDING_MODEL, SemanticCache, SentenceEmbedder
+
+_llm = None
+_screening_cache = None
+_cache_ready = False
+_init_lock = threading.Lock()
+
+
+def get_llm():
+    """The Gemini chat model; reads GOOGLE_API_KEY when first used."""
+    global _llm
+    with _init_lock:
+        if _llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            _llm = ChatGoogleGenerativeAI(model="gemini-pro", temperature=0.7)
+        return _llm
+
+
+# ✅ Semantic cache: paraphrased intake descriptions reuse an earlier screening
+def create_screening_cache():
+    if os.getenv("SCREENING_CACHE", "1") == "0":
+        return None
+    try:
+        embedder = SentenceEmbedder(os.getenv("SCREENING_CACHE_MODEL", DEFAULT_EMBEDDING_MODEL))
+    except Exception as e:
+        print(f"Screening cache disabled: {e}", file=sys.stderr)
+        return None
+    return SemanticCache(
+        embedder,
+        path=os.getenv("SCREENING_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "screening_cache.npz")),
+        threshold=float(os.getenv("SCREENING_CACHE_THRESHOLD", 0.9)),
+        max_entries=int(os.getenv("SCREENING_CACHE_SIZE", 2000)),
+        ttl=float(os.getenv("SCREENING_CACHE_TTL_DAYS", 30)) * 86400,
+        index=os.getenv("SCREENING_CACHE_INDEX", "matrix"),
+    )
+
+
+def get_screening_cache():
+    """The process-wide screening cache, or None if it is disabled or unavailable."""
+    global _screening_cache, _cache_ready
+    with _init_lock:
+        if not _cache_ready:
+            _screening_cache = create_screening_cache()
+            _cache_ready = True
+        return _screening_cache
+
+
+# ✅ Convert plain text output into HTML
+def render_profile_html(output):
+    parts = ["<div style='font-family:Arial; line-height:1.5;'>"]
+    for line in output.split("\n"):
+        if line.startswith("- "):
+            parts.append(f"<li>{line[2:]}</li>")
+        elif line.endswith(":") and not line.startswith("Confidence"):
+            parts.append(f"<h4 style='margin-top:10px;'>{line}</h4>")
+        elif "Confidence" in line:
+            parts.append(f"<p><b>{line}</b></p>")
+        else:
+            parts.append(f"<p>{line}</p>")
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def render_cached_notice(similarity):
+    return (f"<p style='color:#666; font-size:0.9em;'>♻️ <i>Cached result from a similar earlier screening "
+            f"(similarity {similarity:.2f}). Rephrase with more detail for a fresh analysis.</i></p>")
+
+
+# ✅ Function to parse AI output and return clean HTML
+def analyze_neuro_profile(user_input, invoke=None):
+    """`invoke` replaces the LLM's invoke, e.g. to route the call through a scheduler."""
+    from langchain_core.messages import HumanMessage
+
+    screening_cache = get_screening_cache()
+    if screening_cache is not None:
+        cached = screening_cache.lookup(user_input)
+        if cached:
+            output, similarity = cached
+            return render_cached_notice(similarity) + render_profile_html(output)
+
+    prompt = f"""
+You are a cognition profiling agent. The user is describing their mental behavior or struggles.
+
+Your job is to:
+1. Identify possible neurodiverse conditions (ADHD, Autism, Dyslexia, Anxiety, OCD, etc.)
+2. For each, provide 1-line reasoning
+3. State confidence level (Low / Medium / High)
+4. Suggest what additional input could improve the diagnosis
+
+Respond in this exact format:
+---
+Possible Conditions:
+- ADHD (Medium): Trouble focusing in noisy spaces
+- Dyslexia (Low): Avoids long paragraphs
+
+Reasoning:
+- Based on symptoms of focus issues and reading avoidance.
+
+Suggestions:
+- Ask about writing, memory, and childhood behavior.
+
+Confidence:
+Medium
+---
+    """
+
+    try:
+        response = (invoke or get_llm().invoke)([HumanMessage(content=prompt + f"\nUser Input:\n{user_input}")])
+        output = response.content.strip()
+        if screening_cache is not None and output:
+            screening_cache.store(user_input, output)
+
+        return render_profile_html(output)
+
+    except Exception as e:
+        return f"<p style='color:red;'>❌ Error: {str(e)}</p>"
@@ -0,0 +1,266 @@
+# Semantic cache: reuse LLM answers for inputs that mean the same thing
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def text_key(text: str) -> str:
+    """Stable key for the exact-match shortcut; the text itself is never stored."""
+    return hashlib.sha256(normalize(text).encode()).hexdigest()
+
+
+class SentenceEmbedder:
+    """Local sentence embeddings (unit length), loaded once per process."""
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def __call__(self, text: str) -> np.ndarray:
+        return self.model.encode([text], normalize_embeddings=True, convert_to_numpy=True)[0].astype(np.float32)
+
+
+# =========================
+# Vector indexes
+# =========================
+class MatrixIndex:
+    """
+    Exact cosine search over one contiguous float32 matrix. A single
+    matrix-vector product; fast enough for tens of thousands of entries.
+    """
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._labels = np.zeros(capacity, dtype=np.int64)
+        self._rows = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, label: int, vector: np.ndarray):
+        if self._size == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+            self._labels = np.concatenate([self._labels, np.zeros_like(self._labels)])
+        self._vectors[self._size] = vector
+        self._labels[self._size] = label
+        self._rows[label] = self._size
+        self._size += 1
+
+    def remove(self, label: int):
+        # Move the last row into the hole so the live rows stay contiguous
+        row = self._rows.pop(label)
+        last = self._size - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._labels[row] = self._labels[last]
+            self._rows[int(self._labels[row])] = row
+        self._size = last
+
+    def search(self, vector: np.ndarray):
+        """Returns (label, cosine similarity) of the nearest entry, or None if empty."""
+        if not self._size:
+            return None
+        similarities = self._vectors[:self._size] @ vector
+        best = int(np.argmax(similarities))
+        return int(self._labels[best]), float(similarities[best])
+
+
+class HNSWIndex:
+    """Approximate search with hnswlib, for caches too large to scan."""
+    def __init__(self, dim: int, capacity: int = 1024, ef: int = 64, m: int = 16):
+        import hnswlib
+        self.dim = dim
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(max_elements=capacity, ef_construction=200, M=m, allow_replace_deleted=True)
+        self._index.set_ef(ef)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, label: int, vector: np.ndarray):
+        if self._index.get_current_count() >= self._index.get_max_elements():
+            self._index.resize_index(2 * self._index.get_max_elements())
+        self._index.add_items(vector[None, :], [label], replace_deleted=True)
+        self._size += 1
+
+    def remove(self, label: int):
+        self._index.mark_deleted(label)
+        self._size -= 1
+
+    def search(self, vector: np.ndarray):
+        if not self._size:
+            return None
+        labels, distances = self._index.knn_query(vector[None, :], k=1)
+        return int(labels[0][0]), 1.0 - float(distances[0][0])
+
+
+def make_index(kind: str, dim: int, capacity: int):
+    if kind == "hnsw":
+        try:
+            return HNSWIndex(dim, capacity)
+        except ImportError:
+            print("hnswlib is not installed; using the exact matrix index", file=sys.stderr)
+    return MatrixIndex(dim, capacity)
+
+
+# =========================
+# Cache
+# =========================
+class SemanticCache:
+    """
+    Maps inputs to cached outputs by meaning rather than exact text.
+
+    - `lookup(text)` returns the entry of the most similar earlier input if
+      its cosine similarity is at least `threshold`. Identical text (after
+      normalising case and whitespace) skips the embedding entirely.
+    - Least recently used entries are evicted beyond `max_entries`; entries
+      older than `ttl` seconds (0: no limit) are never returned.
+    - With a `path`, entries are saved after every store and reloaded on
+      start. Only embeddings, text hashes and outputs are written to disk.
+    - A miss remembers the input's embedding for a short while, so storing
+      the answer for the same text right after does not embed it again.
+    """
+    PENDING_VECTORS = 64
+
+    def __init__(self, embed, path: str = None, threshold: float = 0.9, max_entries: int = 2000,
+                 ttl: float = 0, index: str = "matrix"):
+        self.embed = embed
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = make_index(index, embed.dim, max_entries)
+        self._entries = OrderedDict()  # label -> entry, least recently used first
+        self._by_key = {}
+        self._pending = OrderedDict()  # key -> vector of recent misses, awaiting store()
+        self._next_label = 0
+        self._version = self._saved_version = 0
+        self._save_lock = threading.Lock()
+        self.hits = self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry, now):
+        return self.ttl and now - entry["created"] > self.ttl
+
+    def lookup(self, text: str):
+        """Returns (output, similarity) for a close enough earlier input, or None."""
+        now = time.time()
+        key = text_key(text)
+        with self._lock:
+            label = self._by_key.get(key)
+            similarity = 1.0
+        vector = None
+        if label is None:
+            vector = self.embed(text)
+            with self._lock:
+                found = self._index.search(vector)
+                if found:
+                    label, similarity = found
+        with self._lock:
+            entry = self._entries.get(label)
+            if entry is None or similarity < self.threshold or self._expired(entry, now):
+                self.misses += 1
+                if vector is not None:
+                    self._pending[key] = vector
+                    self._pending.move_to_end(key)
+                    while len(self._pending) > self.PENDING_VECTORS:
+                        self._pending.popitem(last=False)
+                return None
+            self._entries.move_to_end(label)
+            self.hits += 1
+            return entry["output"], similarity
+
+    def store(self, text: str, output: str, vector: np.ndarray = None):
+        """`vector` is the embedding of `text`, if the caller already has it."""
+        key = text_key(text)
+        if vector is None:
+            with self._lock:
+                vector = self._pending.pop(key, None)
+        if vector is None:
+            vector = self.embed(text)
+        with self._lock:
+            if key in self._by_key:
+                self._remove(self._by_key[key])
+            self._add(key, vector, output, time.time())
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            if not self.path:
+                return
+            self._version += 1
+            snapshot = (self._version, list(self._entries.values()))
+        # The file is written outside the lock, so lookups don't wait for the disk
+        self._save(*snapshot)
+
+    def _add(self, key, vector, output, created):
+        label = self._next_label
+        self._next_label += 1
+        self._index.add(label, vector)
+        self._entries[label] = {"key": key, "vector": vector, "output": output, "created": created}
+        self._by_key[key] = label
+
+    def _remove(self, label):
+        entry = self._entries.pop(label)
+        del self._by_key[entry["key"]]
+        self._index.remove(label)
+
+    # --- Persistence ---
+    def _save(self, version, entries):
+        meta = {
+            "model": getattr(self.embed, "model_name", None),
+            "entries": [{"key": e["key"], "output": e["output"], "created": e["created"]} for e in entries],
+        }
+        vectors = np.stack([e["vector"] for e in entries]) if entries else np.zeros((0, self.embed.dim), np.float32)
+        tmp = f"{self.path}.tmp"
+        with self._save_lock:
+            # A concurrent store may already have written a newer snapshot
+            if version <= self._saved_version:
+                return
+            with open(tmp, "wb") as f:
+                np.savez(f, vectors=vectors, meta=np.array(json.dumps(meta)))
+            os.replace(tmp, self.path)
+            self._saved_version = version
+
+    def _load(self):
+        try:
+            with np.load(self.path) as data:
+                vectors = data["vectors"]
+                meta = json.loads(str(data["meta"]))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable semantic cache {self.path}: {e}", file=sys.stderr)
+            return
+        if meta.get("model") != getattr(self.embed, "model_name", None) or vectors.shape[1:] != (self.embed.dim,):
+            print(f"Semantic cache {self.path} was built with another embedding model; starting empty",
+                  file=sys.stderr)
+            return
+        now = time.time()
+        for entry, vector in zip(meta["entries"], vectors):
+            if not self._expired(entry, now):
+                self._add(entry["key"], vector, entry["output"], entry["created"])
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
@@ -0,0 +1,184 @@
+# Pre-fork production server for the Emotion Agent
+#
+#   python agent/serve_emotion.py export ./emotion-model       # one-off: save weights as safetensors
+#   EMOTION_MODEL=./emotion-model python agent/serve_emotion.py serve --workers 4
+#   python agent/serve_emotion.py memory <parent-pid>           # RSS/PSS per process
+#
+# The classifier is loaded once in the parent and the workers are forked
+# afterwards, so every worker shares the weight pages copy-on-write.
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+
+# =========================
+# Weights
+# =========================
+def export_weights(out_dir):
+    """Saves the classifier as safetensors, which loads via mmap instead of unpickling."""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    import emotion
+    model_name = os.getenv("EMOTION_MODEL", emotion.DEFAULT_EMOTION_MODEL)
+    AutoModelForSequenceClassification.from_pretrained(model_name).save_pretrained(out_dir, safe_serialization=True)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(out_dir)
+    print(f"Saved {model_name} to {out_dir}")
+
+
+# =========================
+# Memory reporting
+# =========================
+def memory_usage(pid):
+    """Returns RSS, PSS and private memory of a process in MiB (Linux only)."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def report_memory(parent_pid):
+    with open(f"/proc/{parent_pid}/task/{parent_pid}/children") as f:
+        workers = [int(pid) for pid in f.read().split()]
+    print(f"{'process':<16}{'RSS MiB':>10}{'PSS MiB':>10}{'private MiB':>13}")
+    total_rss = total_pss = 0.0
+    for label, pid in [("parent", parent_pid)] + [(f"worker {pid}", pid) for pid in workers]:
+        usage = memory_usage(pid)
+        total_rss += usage["rss"]
+        total_pss += usage["pss"]
+        print(f"{label:<16}{usage['rss']:>10.1f}{usage['pss']:>10.1f}{usage['private']:>13.1f}")
+    # Summed RSS counts shared pages again for every process; summed PSS is the real footprint
+    print(f"{'sum':<16}{total_rss:>10.1f}{total_pss:>10.1f}")
+
+
+# =========================
+# Workers
+# =========================
+def run_worker(app, listener, max_requests, max_private_mb, threads):
+    """Serves requests until the recycling limits are hit, then exits."""
+    from werkzeug.serving import make_server
+    import torch
+
+    # Each worker gets its share of the cores instead of all of them
+    torch.set_num_threads(threads)
+    random.seed()
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, fd=listener.fileno())
+    # Spread restarts so workers don't all recycle at once
+    limit = max_requests + random.randint(0, max_requests // 10) if max_requests else 0
+    served = 0
+    while not limit or served < limit:
+        server.handle_request()
+        served += 1
+        if max_private_mb and memory_usage(os.getpid())["private"] > max_private_mb:
+            print(f"Worker {os.getpid()} over {max_private_mb} MiB private memory, recycling", file=sys.stderr)
+            break
+    os._exit(0)
+
+
+def spawn_worker(app, listener, args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, listener, args.max_requests, args.max_private_mb, args.threads)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def serve(args):
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("ERROR: The GOOGLE_API_KEY environment variable is not set.", file=sys.stderr)
+        sys.exit(1)
+
+    # Load everything in the parent, before any fork
+    import emotion
+    emotion.emotion_agent = emotion.create_emotion_agent(emotion.llm_scheduler)
+    emotion.emotion_agent.detect_emotion("Warming up the classifier.")
+
+    listener = socket.create_server((args.host, args.port), backlog=2048, reuse_port=False)
+    listener.set_inheritable(True)
+
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers don't write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+    workers = {spawn_worker(emotion.app, listener, args) for _ in range(args.workers)}
+    print(f"Emotion Agent serving on http://{args.host}:{args.port} with {args.workers} workers "
+          f"(parent pid {os.getpid()})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            if os.waitstatus_to_exitcode(status) != 0:
+                print(f"Worker {pid} exited with status {status}, replacing it", file=sys.stderr)
+                time.sleep(1)
+            workers.add(spawn_worker(emotion.app, listener, args))
+    listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the Emotion Agent")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = commands.add_parser("serve", help="serve with N forked workers")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=5000)
+    serve_cmd.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    serve_cmd.add_argument("--threads", type=int, default=1, help="torch threads per worker")
+    serve_cmd.add_argument("--max-requests", type=int, default=2000,
+                           help="recycle a worker after this many requests (0: never)")
+    serve_cmd.add_argument("--max-private-mb", type=float, default=0,
+                           help="recycle a worker whose private memory exceeds this (0: never)")
+
+    export_cmd = commands.add_parser("export", help="save the classifier weights as safetensors")
+    export_cmd.add_argument("out_dir")
+
+    memory_cmd = commands.add_parser("memory", help="print RSS/PSS of a running server")
+    memory_cmd.add_argument("parent_pid", type=int)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args)
+    elif args.command == "export":
+        export_weights(args.out_dir)
+    else:
+        report_memory(args.parent_pid)
+
+
+if __name__ == "__main__":
+    main()
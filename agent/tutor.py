@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
 import time # For simulating processing time
-import google.generativeai as genai # Import the Google Generative AI library
 import os # To access environment variables for the API key
+from gemini import gemini_model # Gemini models bound to their own API key
 
 # --- Configure your Gemini API Key ---
 # IMPORTANT: Replace 'YOUR_GEMINI_API_KEY' with your actual API key.
@@ -12,13 +12,74 @@ import os # To access environment variables for the API key
 # GEMINI_API_KEY = "YOUR_API_KEY_HERE"
 # You can get an API key from Google AI Studio: https://ai.google.dev/
 API_KEY = os.getenv("GEMINI_API_KEY", "YOURAPIKEY") # Replace with your key or set as env var
+# Passed to each model instead of genai.configure(); see gemini.py
+
+TUTOR_MODEL = 'gemini-2.5-flash-preview-05-20'
+
+# --- Curriculum grounding (optional) ---
+# Build the index with agent/curriculum_index.py and point this at its directory.
+# The most relevant syllabus passages, within a token budget, go into the prompt.
+CURRICULUM_INDEX = os.getenv("NEUROBRIDGE_CURRICULUM_INDEX")
+CURRICULUM_PASSAGES = int(os.getenv("NEUROBRIDGE_CURRICULUM_PASSAGES", 4))
+CURRICULUM_TOKENS = int(os.getenv("NEUROBRIDGE_CURRICULUM_TOKENS", 600))
+
+curriculum = None
+if CURRICULUM_INDEX:
+    try:
+        from curriculum_index import CurriculumIndex
+        curriculum = CurriculumIndex(CURRICULUM_INDEX)
+    except Exception as e:
+        print(f"Error loading curriculum index {CURRICULUM_INDEX}: {e}")
+        print("Explanations will not be grounded in the syllabus.")
+
+
+def syllabus_excerpts(subject, topic):
+    """Returns the syllabus passages for a topic as numbered prompt lines, or '' if there are none."""
+    if curriculum is None:
+        return ""
+    from curriculum_index import format_context
+    try:
+        return format_context(curriculum.retrieve(f"{subject} {topic}", CURRICULUM_PASSAGES, CURRICULUM_TOKENS))
+    except Exception as e:
+        print(f"Error searching the curriculum index: {e}")
+        return ""
+
+
+def simplify_topic(model, subject, topic):
+    """
+    Asks the model for a short, enthusiastic explanation of a topic.
+    Free of Tkinter so the dashboard server can call it too.
+    """
+    prompt = f"""
+    Explain the topic '{topic}' in the subject of '{subject}' in the most simplified way possible.
+    Imagine you are explaining it to someone who is new to the topic.
+    Use clear, concise language and avoid overly technical jargon.
+    Include enthusiasm and use emojis where appropriate to make it engaging.
+    Keep the explanation relatively brief, around 100-200 words.
+    """
+
+    excerpts = syllabus_excerpts(subject, topic)
+    if excerpts:
+        prompt += f"""
+    Base the explanation on these excerpts from our syllabus, and stay consistent with them:
+{excerpts}
+    """
+
+    try:
+        response = model.generate_content(prompt)
+        return response.text
+    except Exception as e:
+        return f"""
+        Oh no! I ran into a bit of a snag while trying to fetch that information. 😔
+        It looks like there might be an issue with connecting to the AI service or
+        processing your request.
+
+        Here's what happened: {e}
+
+        Please double-check your API key and your internet connection,
+        then give it another try! You've got this! 💪
+        """
 
-# Configure the Generative AI model
-try:
-    genai.configure(api_key=API_KEY)
-except Exception as e:
-    print(f"Error configuring Generative AI: {e}")
-    print("Please ensure your API_KEY is valid and correctly set.")
 
 class TutorAgentApp:
     def __init__(self, master):
@@ -80,7 +141,7 @@ class TutorAgentApp:
         # Initialize the Gemini model
         self.model = None
         try:
-            self.model = genai.GenerativeModel('gemini-2.5-flash-preview-05-20')
+            self.model = gemini_model(TUTOR_MODEL, API_KEY)
         except Exception as e:
             messagebox.showerror("Model Error", f"Failed to load Gemini model. Please check your API key and network connection: {e}")
 
@@ -91,30 +152,9 @@ class TutorAgentApp:
         if not self.model:
             return "Oops! The AI model isn't ready. Please check your API key setup."
 
-        prompt = f"""
-        Explain the topic '{topic}' in the subject of '{subject}' in the most simplified way possible.
-        Imagine you are explaining it to someone who is new to the topic.
-        Use clear, concise language and avoid overly technical jargon.
-        Include enthusiasm and use emojis where appropriate to make it engaging.
-        Keep the explanation relatively brief, around 100-200 words.
-        """
-
-        try:
-            # Simulate a little processing delay before sending to API
-            time.sleep(0.5)
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"""
-            Oh no! I ran into a bit of a snag while trying to fetch that information. 😔
-            It looks like there might be an issue with connecting to the AI service or
-            processing your request.
-
-            Here's what happened: {e}
-
-            Please double-check your API key and your internet connection,
-            then give it another try! You've got this! 💪
-            """
+        # Simulate a little processing delay before sending to API
+        time.sleep(0.5)
+        return simplify_topic(self.model, subject, topic)
 
     def get_explanation(self):
         """
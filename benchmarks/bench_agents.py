@@ -0,0 +1,196 @@
+# Benchmarks for the agent hot paths
+#
+# Each benchmark is a setup function returning the zero-argument callable to
+# time. Setup cost is not measured. A setup that fails (usually because a
+# package isn't installed) is reported as skipped.
+import base64
+import importlib.util
+import itertools
+import os
+import random
+import tempfile
+
+from fakes import FakeLLM, HashEmbedder, TinyClassifier, screening_output
+
+BENCHMARKS = {}
+
+_scratch = tempfile.mkdtemp(prefix="neurobridge-bench-")
+# Keep module-level side effects of the agents (databases, keys, rate limits) out of the way
+os.environ.setdefault("REWRITE_JOBS_DB", os.path.join(_scratch, "rewrite_jobs.sqlite3"))
+os.environ.setdefault("NEUROBRIDGE_JOBS_DB", os.path.join(_scratch, "jobs.sqlite3"))
+os.environ.setdefault("NEUROBRIDGE_PROFILES_DB", os.path.join(_scratch, "profiles.sqlite3"))
+os.environ.setdefault("NEUROBRIDGE_MASTER_KEY", base64.b64encode(os.urandom(32)).decode())
+os.environ.setdefault("FLASK_SECRET_KEY", base64.b64encode(os.urandom(32)).decode())
+# analyze_profile measures the uncached path; the cache has its own benchmark
+os.environ.setdefault("SCREENING_CACHE", "0")
+for name in ("LLM_LEARNER_RPM", "LLM_LEARNER_BURST", "LLM_ROUTE_RPM", "LLM_ROUTE_BURST"):
+    os.environ.setdefault(name, "1e12")
+
+SHORT_MESSAGE = "I failed my math test today and I feel really sad about it."
+JOURNAL_ENTRY = " ".join([
+    "Today started fine and I was happy to see my friends at school.",
+    "Then the teacher announced a surprise quiz and I got really anxious.",
+    "I could not focus because the room was noisy and I felt alone.",
+    "After lunch things got better and we had fun in art class.",
+] * 40)
+EASY_TEXT = "The sun is hot. It gives us light. Plants use it to grow."
+HARD_TEXT = "\n\n".join([
+    "Photosynthesis constitutes the fundamental biochemical mechanism whereby chlorophyll-containing "
+    "organisms transform electromagnetic radiation into chemically stored energy.",
+    "The sun is hot. It gives us light.",
+] * 20)
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _emotion_agent():
+    import emotion
+    return emotion.EmotionAgent(api_key="offline", emotion_classifier=TinyClassifier(), gemini_model=FakeLLM())
+
+
+# --- Emotion Agent ---
+@benchmark("emotion.detect_single")
+def bench_detect_single():
+    agent = _emotion_agent()
+    return lambda: agent.detect_emotion(SHORT_MESSAGE)
+
+
+@benchmark("emotion.detect_batched")
+def bench_detect_batched():
+    agent = _emotion_agent()
+    return lambda: agent.detect_emotion_timeline(JOURNAL_ENTRY)
+
+
+# --- Cognition Agent ---
+@benchmark("cognition.render_html_large")
+def bench_render_html():
+    import screening
+    output = screening_output(2000)
+    return lambda: screening.render_profile_html(output)
+
+
+@benchmark("cognition.analyze_profile")
+def bench_analyze_profile():
+    import langchain_core.messages  # noqa: F401 -- used inside analyze_neuro_profile
+    import screening
+    llm = FakeLLM(screening_output(200))
+    return lambda: screening.analyze_neuro_profile("I can't focus in noisy rooms and avoid long paragraphs.",
+                                                   invoke=llm.invoke)
+
+
+def _screening_cache_benchmark(index):
+    def setup():
+        from semantic_cache import SemanticCache
+        if index == "hnsw":
+            import hnswlib  # noqa: F401 -- don't silently time the matrix fallback
+        cache = SemanticCache(HashEmbedder(), max_entries=5000, index=index)
+        rng = random.Random(0)
+        words = "focus noise reading loud rooms letters memory lists anxious crowds routine change".split()
+        for i in range(5000):
+            cache.store(" ".join(rng.choices(words, k=12)) + f" case {i}", "Possible Conditions:")
+        query = "noise makes me lose focus when reading in loud rooms"
+        return lambda: cache.lookup(query)
+    return setup
+
+
+benchmark("cognition.screening_cache_lookup")(_screening_cache_benchmark("matrix"))
+benchmark("cognition.screening_cache_lookup_hnsw")(_screening_cache_benchmark("hnsw"))
+
+
+# --- Tutor Agent ---
+def _synthetic_passages(count, rng):
+    # Zipf-like vocabulary so a few terms are common and most are rare, as in real text
+    vocabulary = [f"term{i}" for i in range(20000)]
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulary))))
+    return [{"text": " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=60)), "source": f"lesson{i // 50}.md",
+             "title": f"Lesson {i // 50}"} for i in range(count)]
+
+
+@benchmark("tutor.curriculum_retrieve_100k")
+def bench_curriculum_retrieve():
+    import curriculum_index
+    index_dir = os.path.join(_scratch, "curriculum")
+    if not os.path.exists(os.path.join(index_dir, curriculum_index.MANIFEST)):
+        os.makedirs(index_dir, exist_ok=True)
+        segment = curriculum_index.write_segment(index_dir, _synthetic_passages(100_000, random.Random(0)))
+        curriculum_index.CurriculumIndex.write_manifest(index_dir, {"segments": [segment], "sources": {}})
+    index = curriculum_index.CurriculumIndex(index_dir)
+    # Two common terms, one mid-frequency, one rare
+    return lambda: index.retrieve("term1 term5 term300 term9000", k=4, token_budget=600)
+
+
+# --- Planner Agent ---
+def _plan_benchmark(subject_count):
+    def setup():
+        from plan import build_study_plan
+        subjects = [f"Subject {i}" for i in range(subject_count)]
+        rng = random.Random(0)
+        return lambda: build_study_plan(subjects, rng)
+    return setup
+
+
+for _count in (1, 10, 100):
+    benchmark(f"plan.build_{_count}_subjects")(_plan_benchmark(_count))
+
+
+def _replan_benchmark(forward, backward):
+    # Each call applies a delta and then undoes it, so every iteration replans from the same state
+    def setup():
+        from plan import StudyPlanner
+        planner = StudyPlanner([f"Subject {i}" for i in range(10)], random.Random(0))
+        return lambda: (planner.apply([forward]), planner.apply([backward]))
+    return setup
+
+
+benchmark("plan.replan_mood")(_replan_benchmark(
+    {"type": "mood", "day": "Tuesday", "mood": "fear"}, {"type": "mood", "day": "Tuesday", "mood": None}))
+benchmark("plan.replan_day_unavailable")(_replan_benchmark(
+    {"type": "unavailable", "day": "Tuesday"}, {"type": "available", "day": "Tuesday"}))
+benchmark("plan.replan_subject_added")(_replan_benchmark(
+    {"type": "subject_added", "subject": "Biology"}, {"type": "subject_removed", "subject": "Biology"}))
+
+
+# --- Rewriter Agent ---
+def _rewrite_benchmark(text):
+    def setup():
+        # rewritter.py pip-installs missing packages at import; skip instead of going online
+        for module in ("flask", "flask_cors", "google.generativeai"):
+            if importlib.util.find_spec(module.split(".")[0]) is None:
+                raise ImportError(f"No module named '{module}'")
+        import json
+        import rewritter
+        from werkzeug.test import Client
+        rewritter.model = FakeLLM("Plants use sunlight to make food.")
+        client = Client(rewritter.app)
+        # Fail setup rather than time an error path
+        response = client.post("/rewrite", json={"text": text})
+        body = json.loads(response.get_data())
+        if response.status_code != 200 or "rewritten_text" not in body:
+            raise RuntimeError(f"/rewrite returned {response.status_code}: {body}")
+        return lambda: client.post("/rewrite", json={"text": text})
+    return setup
+
+
+benchmark("rewrite.request_already_easy")(_rewrite_benchmark(EASY_TEXT))
+benchmark("rewrite.request_mixed")(_rewrite_benchmark(HARD_TEXT))
+
+
+# --- Dashboard ---
+@benchmark("main.launch_agent")
+def bench_launch_agent():
+    import main
+
+    class _NoProcess:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    def launch():
+        # Time the launcher itself, not the child Python interpreter it starts
+        with main.app.app_context():
+            return main.launch_agent("agent/plan.py", popen=_NoProcess)
+    return launch
@@ -0,0 +1,89 @@
+# Offline stand-ins for the Gemini API and the Hugging Face classifier
+import math
+import re
+import zlib
+
+LABELS = ("anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise")
+
+# A few cue words per label; enough to give the classifier real work per token
+_CUES = {
+    "anger": ("angry", "furious", "hate", "annoyed", "unfair"),
+    "disgust": ("gross", "disgusting", "awful", "nasty"),
+    "fear": ("scared", "afraid", "worried", "anxious", "nervous"),
+    "joy": ("happy", "great", "love", "excited", "glad", "fun"),
+    "sadness": ("sad", "alone", "lonely", "cry", "tired", "failed"),
+    "surprise": ("wow", "unexpected", "suddenly", "surprised"),
+}
+_WORD_RE = re.compile(r"[a-z']+")
+MAX_TOKENS = 512
+
+
+class TinyClassifier:
+    """
+    A bag-of-words softmax classifier with the call signature of a
+    transformers text-classification pipeline.
+    """
+    def _scores(self, text):
+        weights = dict.fromkeys(LABELS, 0.0)
+        weights["neutral"] = 0.5
+        for word in _WORD_RE.findall(text.lower())[:MAX_TOKENS]:
+            for label, cues in _CUES.items():
+                if word in cues:
+                    weights[label] += 1.0
+        total = sum(math.exp(w) for w in weights.values())
+        scores = [{"label": label, "score": math.exp(w) / total} for label, w in weights.items()]
+        return sorted(scores, key=lambda item: item["score"], reverse=True)
+
+    def __call__(self, inputs, top_k=1, truncation=False, batch_size=None):
+        if isinstance(inputs, str):
+            scores = self._scores(inputs)
+            return scores if top_k is None else scores[:top_k]
+        results = [self._scores(text) for text in inputs]
+        return results if top_k is None else [scores[:top_k] for scores in results]
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+        self.content = text
+
+
+class FakeLLM:
+    """Answers instantly with a canned reply; covers generate_content() and invoke()."""
+    def __init__(self, reply="Here is a short, friendly answer."):
+        self.reply = reply
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        return _Response(self.reply)
+
+    def invoke(self, messages):
+        self.calls += 1
+        return _Response(self.reply)
+
+
+def screening_output(conditions=200):
+    """A long cognition-agent reply in the format the prompt asks for."""
+    lines = ["---", "Possible Conditions:"]
+    lines += [f"- Condition {i} (Medium): Trouble focusing in noisy spaces" for i in range(conditions)]
+    lines += ["", "Reasoning:"]
+    lines += [f"- Observation {i} based on reported focus and reading habits." for i in range(conditions)]
+    lines += ["", "Suggestions:", "- Ask about writing, memory, and childhood behavior.", "", "Confidence:", "Medium", "---"]
+    return "\n".join(lines)
+
+
+class HashEmbedder:
+    """Hashed bag-of-words vectors (unit length) standing in for a sentence embedding model."""
+    model_name = "hash-embedder"
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def __call__(self, text):
+        import numpy as np
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD_RE.findall(text.lower()):
+            vector[zlib.crc32(word.encode()) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,198 @@
+# Micro-benchmark runner with JSON baselines and regression checks
+#
+#   python benchmarks/run.py run                       # run everything, print a table
+#   python benchmarks/run.py run -k plan -o out.json   # filter by name, save results
+#   python benchmarks/run.py run --save-baseline main  # write benchmarks/baselines/main.json
+#   python benchmarks/run.py compare benchmarks/baselines/main.json out.json
+#
+# `compare` exits with status 1 if any benchmark got significantly slower:
+# its median grew by more than --threshold and a Mann-Whitney U test on the
+# raw samples rejects "same distribution" at --alpha.
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+sys.path.insert(0, os.path.join(ROOT, "agent"))
+sys.path.insert(0, ROOT)
+
+
+# =========================
+# Measuring
+# =========================
+def calibrate(fn, min_time):
+    """Finds a loop count that makes one sample take at least `min_time` seconds."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            return loops
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+
+def measure(fn, samples, min_time):
+    """Returns per-call times in seconds, one per sample."""
+    fn()  # warm-up: imports, caches, lazy initialisation
+    loops = calibrate(fn, min_time)
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - start) / loops)
+    return times, loops
+
+
+def run_benchmarks(pattern, samples, min_time):
+    from bench_agents import BENCHMARKS
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        try:
+            fn = setup()
+        except Exception as e:
+            # Usually a missing optional package; the rest of the suite still runs
+            print(f"{name:<36} skipped ({type(e).__name__}: {e})", file=sys.stderr)
+            continue
+        times, loops = measure(fn, samples, min_time)
+        results[name] = {
+            "median": statistics.median(times),
+            "mean": statistics.fmean(times),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+            "loops": loops,
+            "samples": times,
+        }
+        print(f"{name:<36} {format_time(results[name]['median']):>12}  ±{format_time(results[name]['stdev'])}")
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+# =========================
+# Comparing
+# =========================
+def mann_whitney_p(a, b):
+    """Two-sided p-value of the Mann-Whitney U test (normal approximation, tie-corrected)."""
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+    rank_sum_a = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum_a - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+def compare(baseline, current, threshold, alpha):
+    regressions = 0
+    print(f"{'benchmark':<36}{'baseline':>12}{'current':>12}{'change':>9}{'p':>9}  verdict")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        old = baseline["results"].get(name)
+        new = current["results"].get(name)
+        if old is None or new is None:
+            print(f"{name:<36}{'(only in ' + ('current' if old is None else 'baseline') + ')':>33}")
+            continue
+        change = new["median"] / old["median"] - 1
+        p = mann_whitney_p(old["samples"], new["samples"])
+        if p < alpha and change > threshold:
+            verdict = "REGRESSION"
+            regressions += 1
+        elif p < alpha and change < -threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        print(f"{name:<36}{format_time(old['median']):>12}{format_time(new['median']):>12}"
+              f"{change:>+9.1%}{p:>9.3g}  {verdict}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NeuroBridge micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run the benchmarks")
+    run_cmd.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    run_cmd.add_argument("-n", "--samples", type=int, default=20)
+    run_cmd.add_argument("--min-time", type=float, default=0.02, help="seconds per sample")
+    run_cmd.add_argument("-o", "--output", help="write results to this JSON file")
+    run_cmd.add_argument("--save-baseline", metavar="NAME", help="write benchmarks/baselines/NAME.json")
+
+    compare_cmd = commands.add_parser("compare", help="compare two result files")
+    compare_cmd.add_argument("baseline")
+    compare_cmd.add_argument("current")
+    compare_cmd.add_argument("--threshold", type=float, default=0.05, help="minimum median slowdown to flag")
+    compare_cmd.add_argument("--alpha", type=float, default=0.01, help="significance level")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.alpha)
+        if regressions:
+            print(f"\n{regressions} significant regression(s).")
+        sys.exit(1 if regressions else 0)
+
+    report = {"environment": environment(), "results": run_benchmarks(args.filter, args.samples, args.min_time)}
+    paths = [args.output] if args.output else []
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        paths.append(os.path.join(BASELINE_DIR, f"{args.save_baseline}.json"))
+    for path in paths:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,31 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, session
 import subprocess
 import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Agent modules import their helpers by bare name, as when launched directly
+sys.path.insert(0, os.path.join(BASE_DIR, "agent"))
+
+from jobs import JobQueue, register_job_routes
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, RateLimited, install_scheduler, learner_id
+from profiles import PasswordHasher, ProfileStore, load_master_key, load_secret_key
 
 app = Flask(__name__)
+app.secret_key = load_secret_key(os.getenv("NEUROBRIDGE_SECRET_KEY_FILE", os.path.join(BASE_DIR, "secret.key")))
+llm_scheduler = install_scheduler(app, LLMScheduler.from_env("session", "screening"))
+
+profile_store = ProfileStore(
+    os.getenv("NEUROBRIDGE_PROFILES_DB", os.path.join(BASE_DIR, "profiles.sqlite3")),
+    load_master_key(os.getenv("NEUROBRIDGE_MASTER_KEY_FILE", os.path.join(BASE_DIR, "master.key"))),
+    cache_size=int(os.getenv("NEUROBRIDGE_PROFILE_CACHE", 256)),
+    hasher=PasswordHasher(n=int(os.getenv("NEUROBRIDGE_SCRYPT_N", 2 ** 15))),
+)
 
 @app.route('/')
 def home():
@@ -20,6 +43,229 @@ def register():
 def dashboard():
     return render_template('dashboard.html')
 
+# --- Learner accounts and profiles ---
+# Only these fields are stored on a profile; anything else in a request is rejected
+PROFILE_FIELDS = ("name", "age", "diagnosis", "preferred_modality", "reading_level", "accommodations")
+
+def profile_fields(data):
+    """Returns (fields, error) for the profile fields of a request body."""
+    unknown = sorted(set(data) - set(PROFILE_FIELDS))
+    if unknown:
+        return None, f"Unknown profile fields: {', '.join(unknown)}."
+    return {field: data[field] for field in PROFILE_FIELDS if field in data}, None
+
+@app.route('/api/register', methods=['POST'])
+def api_register():
+    data = request.get_json(silent=True) or {}
+    email, password = data.pop('email', None), data.pop('password', None)
+    if not isinstance(email, str) or not isinstance(password, str) or not email or not password:
+        return jsonify({"error": "Email and password are required."}), 400
+    fields, error = profile_fields(data)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        learner_id = profile_store.register(email, password, fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    session['learner_id'] = learner_id
+    return jsonify({"learner_id": learner_id}), 201
+
+@app.route('/api/signin', methods=['POST'])
+def api_signin():
+    data = request.get_json(silent=True) or {}
+    email, password = data.get('email'), data.get('password')
+    if not isinstance(email, str) or not isinstance(password, str):
+        return jsonify({"error": "Email and password are required."}), 400
+    learner_id = profile_store.authenticate(email, password)
+    if learner_id is None:
+        return jsonify({"error": "Invalid credentials."}), 401
+    session['learner_id'] = learner_id
+    return jsonify({"learner_id": learner_id, "name": profile_store.profile(learner_id).get('name')})
+
+@app.route('/api/signout', methods=['POST'])
+def api_signout():
+    session.pop('learner_id', None)
+    return jsonify({"status": "success"})
+
+@app.route('/api/profile', methods=['GET', 'PATCH'])
+def api_profile():
+    """GET ?fields=diagnosis,preferred_modality decrypts only the fields asked for."""
+    learner_id = session.get('learner_id')
+    profile = profile_store.profile(learner_id) if learner_id else None
+    if profile is None:
+        return jsonify({"error": "Not signed in."}), 401
+    if request.method == 'PATCH':
+        fields, error = profile_fields(request.get_json(silent=True) or {})
+        if error:
+            return jsonify({"error": error}), 400
+        profile_store.set_fields(learner_id, fields)
+    fields = request.args.get('fields')
+    return jsonify(profile.to_dict(fields.split(',') if fields else None))
+
+# --- Study session orchestration ---
+SESSION_DEADLINE = float(os.getenv("NEUROBRIDGE_SESSION_DEADLINE", 20))
+session_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="session")
+# Explanations wait on Gemini, so they get their own threads and a cap on how many
+# are in flight; a slow upstream then can't starve the local mood and plan steps
+MAX_EXPLANATIONS = int(os.getenv("NEUROBRIDGE_SESSION_EXPLANATIONS", 8))
+explanation_executor = ThreadPoolExecutor(max_workers=MAX_EXPLANATIONS, thread_name_prefix="explanation")
+_explanation_slots = threading.BoundedSemaphore(MAX_EXPLANATIONS)
+_agents = {}
+_agent_locks = {"emotion": threading.Lock(), "tutor": threading.Lock()}
+
+def get_agent(name):
+    """Lazily builds the emotion agent and tutor model once per process."""
+    # One lock per agent: a slow classifier load doesn't hold up the tutor
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+    with _agent_locks[name]:
+        if name not in _agents:
+            if name == "emotion":
+                from emotion import create_emotion_agent
+                _agents[name] = create_emotion_agent()
+            elif name == "tutor":
+                from gemini import gemini_model
+                from tutor import API_KEY, TUTOR_MODEL
+                # Calls give up at the session deadline instead of holding a thread
+                _agents[name] = gemini_model(TUTOR_MODEL, API_KEY, timeout=SESSION_DEADLINE)
+        return _agents[name]
+
+def detect_mood(message):
+    return get_agent("emotion").detect_emotion(message)
+
+def plan_for_mood(subjects, mood_future, mood_deadline):
+    """Waits for the mood until `mood_deadline`, then plans with or without it."""
+    from plan import build_study_plan
+    mood = None
+    if mood_future is not None:
+        try:
+            mood = mood_future.result(timeout=max(0.0, mood_deadline - time.monotonic()))
+        except Exception:
+            pass
+    today = date.today().strftime("%A")
+    return {"plan": build_study_plan(subjects, moods={today: mood} if mood else None), "mood_applied": mood}
+
+def explain_topic(subject, topic, learner):
+    from tutor import simplify_topic
+    return llm_scheduler.call(simplify_topic, get_agent("tutor"), subject, topic,
+                              learner=learner, route="session", priority=INTERACTIVE)
+
+@app.route('/api/session/start', methods=['POST'])
+def start_study_session():
+    """
+    Starts a study session in one request: mood detection and the first
+    explanation run concurrently; the plan starts as soon as the mood is known.
+    Steps still running at the deadline are reported as timed out and the
+    rest of the results are returned.
+    """
+    data = request.get_json(silent=True) or {}
+    budget = data.get("deadline", SESSION_DEADLINE)
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or not 0 < budget < float("inf"):
+        return jsonify({"error": "deadline must be a positive number of seconds."}), 400
+    learner = learner_id(request)
+    started = time.monotonic()
+    deadline = started + min(budget, SESSION_DEADLINE)
+    timings = {}
+
+    def timed(name, fn, *args):
+        step_start = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            timings[name] = round((time.monotonic() - step_start) * 1000, 1)
+
+    futures, steps = {}, {}
+    if data.get("message"):
+        futures["emotion"] = session_executor.submit(timed, "emotion", detect_mood, data["message"])
+    if data.get("subject") and data.get("topic"):
+        if _explanation_slots.acquire(blocking=False):
+            future = explanation_executor.submit(
+                timed, "explanation", explain_topic, data["subject"], data["topic"], learner)
+            future.add_done_callback(lambda _: _explanation_slots.release())
+            futures["explanation"] = future
+        else:
+            steps["explanation"] = {"status": "busy", "retry_after": 1}
+    if data.get("subjects"):
+        # Leave the planner a little time after the mood budget runs out
+        futures["plan"] = session_executor.submit(
+            timed, "plan", plan_for_mood, data["subjects"], futures.get("emotion"), deadline - 0.05)
+
+    wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            steps[name] = {"status": "timeout", "ms": round((time.monotonic() - started) * 1000, 1)}
+        elif isinstance(future.exception(), RateLimited):
+            steps[name] = {"status": "rate_limited", "retry_after": round(future.exception().retry_after, 1)}
+        elif future.exception() is not None:
+            steps[name] = {"status": "error", "error": str(future.exception()), "ms": timings.get(name)}
+        else:
+            results[name] = future.result()
+            steps[name] = {"status": "ok", "ms": timings.get(name)}
+
+    return jsonify({
+        "results": results,
+        "steps": steps,
+        "total_ms": round((time.monotonic() - started) * 1000, 1),
+    })
+
+# --- Incremental study plans ---
+# Live plans per learner, kept in memory so replans only touch the days that change
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+PLAN_CACHE = int(os.getenv("NEUROBRIDGE_PLAN_CACHE", 1000))
+
+@app.route('/api/plan', methods=['GET', 'POST'])
+def api_plan():
+    from plan import DAYS_OF_WEEK, StudyPlanner
+    learner = session.get('learner_id')
+    if learner is None:
+        return jsonify({"error": "Not signed in."}), 401
+    with _plans_lock:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            subjects, moods = data.get("subjects"), data.get("moods") or {}
+            if not isinstance(subjects, list) or not subjects or not all(isinstance(s, str) and s.strip() for s in subjects):
+                return jsonify({"error": "subjects must be a non-empty list of subject names."}), 400
+            if not isinstance(moods, dict) or not all(d in DAYS_OF_WEEK and isinstance(m, str) for d, m in moods.items()):
+                return jsonify({"error": "moods must map days of the week to emotions."}), 400
+            _plans[learner] = StudyPlanner(subjects, moods=moods)
+            while len(_plans) > PLAN_CACHE:
+                _plans.popitem(last=False)
+        planner = _plans.get(learner)
+        if planner is None:
+            return jsonify({"error": "No plan yet; POST subjects to /api/plan first."}), 404
+        _plans.move_to_end(learner)
+        return jsonify({"plan": planner.to_dict(), "version": planner.version})
+
+@app.route('/api/plan/replan', methods=['POST'])
+def api_replan():
+    """
+    Applies deltas such as {"type": "mood", "mood": "fear"} (day defaults to
+    today), {"type": "unavailable", "day": "Tuesday"}, {"type": "subject_added",
+    "subject": "Biology"} or {"type": "completed", "day", "subject"} and returns
+    only the days whose activities changed.
+    """
+    learner = session.get('learner_id')
+    if learner is None:
+        return jsonify({"error": "Not signed in."}), 401
+    deltas = (request.get_json(silent=True) or {}).get("deltas") or []
+    if not isinstance(deltas, list) or not all(isinstance(delta, dict) for delta in deltas):
+        return jsonify({"error": "deltas must be a list of objects."}), 400
+    today = date.today().strftime("%A")
+    deltas = [{"day": today, **delta} if delta.get("type") == "mood" else delta for delta in deltas]
+    with _plans_lock:
+        planner = _plans.get(learner)
+        if planner is None:
+            return jsonify({"error": "No plan yet; POST subjects to /api/plan first."}), 404
+        try:
+            return jsonify(planner.apply(deltas))
+        except (ValueError, KeyError) as e:
+            return jsonify({"error": f"Invalid delta: {e}"}), 400
+
 # Example agent launcher
 @app.route('/run/cognition')
 def run_cognition():
@@ -46,14 +292,41 @@ def run_progress():
     return launch_agent('agent/progress.py')
 
 
+# --- Background jobs ---
+def screening_job(job, payload):
+    """Screen a batch of intake descriptions with the cognition agent."""
+    from screening import analyze_neuro_profile, get_llm
+    descriptions = payload["descriptions"]
+    profiles = []
+    for i, description in enumerate(descriptions):
+        # Only real LLM calls go through the scheduler; cache hits return straight away
+        invoke = lambda messages: llm_scheduler.call(get_llm().invoke, messages, learner=job.user,
+                                                     route="screening", priority=BATCH)
+        profiles.append(analyze_neuro_profile(description, invoke=invoke))
+        job.progress((i + 1) / len(descriptions), f"Screened {i + 1} of {len(descriptions)}")
+    return {"profiles": profiles}
+
+def cohort_plan_job(job, payload):
+    """Generate a weekly plan for every learner in a cohort."""
+    from plan import build_study_plan
+    learners = payload["learners"]
+    plans = {}
+    for i, learner in enumerate(learners):
+        plans[learner["learner_id"]] = build_study_plan(learner["subjects"])
+        job.progress((i + 1) / len(learners), f"Planned {i + 1} of {len(learners)}")
+    return {"plans": plans}
 
+job_queue = JobQueue(os.getenv("NEUROBRIDGE_JOBS_DB", os.path.join(BASE_DIR, "jobs.sqlite3")))
+job_queue.register("screening", screening_job)
+job_queue.register("cohort_plan", cohort_plan_job)
+register_job_routes(app, job_queue)
 
 
-def launch_agent(script_path):
+def launch_agent(script_path, popen=subprocess.Popen):
     abs_path = os.path.join(os.path.dirname(__file__), script_path)
     if not os.path.exists(abs_path):
         return jsonify({"error": f"Agent not found: {abs_path}"}), 404
-    subprocess.Popen(["python", abs_path])
+    popen(["python", abs_path])
     return jsonify({"status": "success", "message": f"Launching {os.path.basename(script_path)}"})
 
 if __name__ == '__main__':
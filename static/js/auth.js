@@ -1,5 +1,14 @@
 
-function handleRegister(event) {
+async function postJSON(url, body) {
+  const response = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body)
+  });
+  return { ok: response.ok, data: await response.json() };
+}
+
+async function handleRegister(event) {
   event.preventDefault();
   const name = document.getElementById('name').value;
   const email = document.getElementById('email').value;
@@ -11,24 +20,32 @@ function handleRegister(event) {
     return false;
   }
 
-  localStorage.setItem("user", JSON.stringify({ name, email, password }));
+  // Credentials go to the server; only non-sensitive details stay in the browser
+  const { ok, data } = await postJSON("/api/register", { name, email, password });
+  if (!ok) {
+    alert(data.error || "Registration failed.");
+    return false;
+  }
+
+  localStorage.setItem("user", JSON.stringify({ learner_id: data.learner_id, name, email }));
   alert("Registration successful!");
-  window.location.href = "signin.html";
+  window.location.href = "/signin";
   return false;
 }
 
-function handleLogin(event) {
+async function handleLogin(event) {
   event.preventDefault();
   const email = document.getElementById('email').value;
   const password = document.getElementById('password').value;
-  const user = JSON.parse(localStorage.getItem("user"));
 
-  if (!user || user.email !== email || user.password !== password) {
+  const { ok, data } = await postJSON("/api/signin", { email, password });
+  if (!ok) {
     alert("Invalid credentials!");
     return false;
   }
 
+  localStorage.setItem("user", JSON.stringify({ learner_id: data.learner_id, name: data.name, email }));
   alert("Login successful!");
-  window.location.href = "index.html";
+  window.location.href = "/";
   return false;
 }
@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+try:
+    import google.ai.generativelanguage as glm
+    import google.generativeai.client as genai_client
+except ImportError:
+    glm = None
+
+from gemini import gemini_model
+
+
+def reply(text):
+    return glm.GenerateContentResponse(candidates=[
+        glm.Candidate(content=glm.Content(role="model", parts=[glm.Part(text=text)]), finish_reason=1)
+    ])
+
+
+@unittest.skipIf(glm is None, "google-generativeai is not installed")
+class GeminiModelTest(unittest.TestCase):
+    def test_each_model_has_its_own_client_and_global_config_is_untouched(self):
+        before = dict(genai_client._client_manager.client_config)
+        first, second = gemini_model("gemini-pro", "key-1"), gemini_model("gemini-pro", "key-2")
+        self.assertIsNot(first._client, second._client)
+        self.assertEqual(first._client._transport._credentials.token, "key-1")
+        self.assertEqual(second._client._transport._credentials.token, "key-2")
+        self.assertEqual(genai_client._client_manager.client_config, before)
+
+    def test_generate_content_sends_the_prompt_with_a_timeout(self):
+        model = gemini_model("gemini-pro", "key", timeout=7)
+        with mock.patch.object(model._client, "generate_content", return_value=reply("Hi there")) as call:
+            self.assertEqual(model.generate_content("Explain gravity").text, "Hi there")
+            model.generate_content("Again", timeout=2)
+        request, kwargs = call.call_args_list[0].args[0], call.call_args_list[0].kwargs
+        self.assertEqual(request.model, "models/gemini-pro")
+        self.assertEqual(request.contents[0].parts[0].text, "Explain gravity")
+        self.assertEqual(kwargs, {"timeout": 7})
+        self.assertEqual(call.call_args_list[1].kwargs, {"timeout": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
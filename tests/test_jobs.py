@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from flask import Flask
+from werkzeug.test import Client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from jobs import CANCELLED, DONE, PRIORITY_HIGH, PRIORITY_LOW, QUEUED, JobQueue, register_job_routes
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class JobQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "jobs.sqlite3")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+
+class OrderingTest(JobQueueTestCase):
+    def test_priority_then_submission_order(self):
+        queue = JobQueue(self.path, workers=1, per_user_limit=10)
+        order = []
+        queue.register("record", lambda job, payload: order.append(payload))
+        queue.submit("record", "low", priority=PRIORITY_LOW)
+        queue.submit("record", "normal-1")
+        queue.submit("record", "high", priority=PRIORITY_HIGH)
+        queue.submit("record", "normal-2")
+        queue.start()
+        self.assertTrue(wait_for(lambda: len(order) == 4))
+        self.assertEqual(order, ["high", "normal-1", "normal-2", "low"])
+
+    def test_per_user_cap(self):
+        queue = JobQueue(self.path, workers=3, per_user_limit=1)
+        release = threading.Event()
+        running, peak = {}, {}
+        lock = threading.Lock()
+
+        def handler(job, payload):
+            with lock:
+                running[job.user] = running.get(job.user, 0) + 1
+                peak[job.user] = max(peak.get(job.user, 0), running[job.user])
+            release.wait(5)
+            with lock:
+                running[job.user] -= 1
+
+        queue.register("hold", handler)
+        ids = [queue.submit("hold", None, user="ada") for _ in range(3)] + [queue.submit("hold", None, user="bo")]
+        queue.start()
+        # bo's job runs alongside one of ada's even though ada's were queued first
+        self.assertTrue(wait_for(lambda: running.get("ada") == 1 and running.get("bo") == 1))
+        release.set()
+        self.assertTrue(wait_for(lambda: all(queue.get(i)["status"] == DONE for i in ids)))
+        self.assertEqual(peak, {"ada": 1, "bo": 1})
+
+
+class RestartTest(JobQueueTestCase):
+    def test_interrupted_and_queued_jobs_run_after_restart(self):
+        first = JobQueue(self.path)
+        first.register("echo", lambda job, payload: payload)
+        interrupted = first.submit("echo", "interrupted")
+        waiting = first.submit("echo", "waiting")
+        first.store.update(interrupted, status="running", started=time.time())
+
+        second = JobQueue(self.path)
+        second.register("echo", lambda job, payload: payload)
+        self.assertEqual(second.get(interrupted)["status"], QUEUED)
+        second.start()
+        self.assertTrue(wait_for(lambda: second.get(waiting)["status"] == DONE))
+        self.assertTrue(wait_for(lambda: second.get(interrupted)["status"] == DONE))
+        self.assertEqual(second.get(interrupted)["result"], "interrupted")
+
+
+class CancelTest(JobQueueTestCase):
+    def test_cancel_queued_job(self):
+        queue = JobQueue(self.path)
+        queue.register("echo", lambda job, payload: payload)
+        job_id = queue.submit("echo", "x")
+        self.assertTrue(queue.cancel(job_id))
+        self.assertEqual(queue.get(job_id)["status"], CANCELLED)
+        self.assertFalse(queue.cancel(job_id))
+
+    def test_cancel_running_job_at_next_progress(self):
+        queue = JobQueue(self.path)
+        started = threading.Event()
+
+        def handler(job, payload):
+            started.set()
+            while True:
+                job.progress(0.5)
+                time.sleep(0.01)
+
+        queue.register("loop", handler)
+        job_id = queue.submit("loop", None)
+        queue.start()
+        self.assertTrue(started.wait(5))
+        self.assertTrue(queue.cancel(job_id))
+        self.assertTrue(wait_for(lambda: queue.get(job_id)["status"] == CANCELLED))
+
+
+class RoutesTest(JobQueueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = Flask(__name__)
+        self.app.secret_key = "test"
+        self.queue = JobQueue(self.path)
+        self.queue.register("echo", lambda job, payload: payload)
+        register_job_routes(self.app, self.queue)
+
+        @self.app.route("/")
+        def home():
+            return "home"
+
+    def client(self, addr):
+        return Client(self.app), {"REMOTE_ADDR": addr}
+
+    def test_other_routes_still_respond_and_workers_start(self):
+        client, env = self.client("10.0.0.1")
+        response = client.get("/", environ_base=env)
+        self.assertEqual((response.status_code, response.get_data(as_text=True)), (200, "home"))
+        self.assertTrue(self.queue._threads)
+
+    def test_jobs_are_visible_only_to_their_submitter(self):
+        owner, owner_env = self.client("10.0.0.1")
+        other, other_env = self.client("10.0.0.2")
+        response = owner.post("/jobs/echo", json={"payload": "secret"}, environ_base=owner_env)
+        self.assertEqual(response.status_code, 202)
+        job_id = json.loads(response.get_data())["job_id"]
+        self.assertTrue(wait_for(lambda: self.queue.get(job_id)["status"] == DONE))
+
+        # A header naming the owner changes nothing
+        headers = {"X-Learner-Id": "10.0.0.1"}
+        self.assertEqual(other.get(f"/jobs/{job_id}", headers=headers, environ_base=other_env).status_code, 404)
+        self.assertEqual(other.delete(f"/jobs/{job_id}", environ_base=other_env).status_code, 404)
+        response = owner.get(f"/jobs/{job_id}", environ_base=owner_env)
+        self.assertEqual(json.loads(response.get_data())["result"], "secret")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, RateLimited
+
+
+class BatchVersusInteractiveAdmissionTest(unittest.TestCase):
+    def test_batch_loop_does_not_starve_interactive_calls(self):
+        # 20 calls/s on the route with a burst of 5; learners themselves are unlimited
+        scheduler = LLMScheduler(max_concurrent=8, learner_rate=1000, learner_burst=1000,
+                                 route_limits={"rewrite": (20, 5)}, max_wait=1.0)
+        stop = threading.Event()
+        batch_calls = []
+
+        def batch_loop():
+            while not stop.is_set():
+                scheduler.call(batch_calls.append, 1, learner="batch-user", route="rewrite", priority=BATCH)
+
+        worker = threading.Thread(target=batch_loop, daemon=True)
+        worker.start()
+        time.sleep(0.3)  # let the batch loop drain the bucket
+
+        refused = 0
+        for i in range(10):
+            try:
+                scheduler.call(lambda: None, learner=f"learner-{i}", route="rewrite", priority=INTERACTIVE)
+            except RateLimited:
+                refused += 1
+            time.sleep(0.05)
+        stop.set()
+        worker.join(timeout=2)
+
+        self.assertEqual(refused, 0)
+        self.assertGreater(len(batch_calls), 0)
+
+    def test_interactive_call_refused_when_wait_exceeds_max_wait(self):
+        scheduler = LLMScheduler(learner_rate=0.1, learner_burst=1, max_wait=0.2)
+        scheduler.call(lambda: None, learner="a")
+        start = time.monotonic()
+        with self.assertRaises(RateLimited):
+            scheduler.call(lambda: None, learner="a")
+        self.assertLess(time.monotonic() - start, 0.2)
+
+    def test_batch_calls_leave_headroom_for_interactive(self):
+        scheduler = LLMScheduler(learner_rate=0.001, learner_burst=5, max_wait=0.1, interactive_reserve=0.4)
+        for _ in range(3):
+            scheduler.call(lambda: None, learner="a", priority=BATCH)
+        # The remaining 2 tokens are only for interactive calls
+        scheduler.call(lambda: None, learner="a", priority=INTERACTIVE)
+        scheduler.call(lambda: None, learner="a", priority=INTERACTIVE)
+
+    def test_idle_learner_state_is_pruned(self):
+        scheduler = LLMScheduler(learner_rate=1000, learner_burst=5)
+        scheduler.PRUNE_INTERVAL = 0
+        for i in range(50):
+            scheduler.call(lambda: None, learner=f"learner-{i}")
+        time.sleep(0.02)
+        scheduler.call(lambda: None, learner="last")
+        self.assertLessEqual(len(scheduler._learner_buckets), 1)
+
+
+class AdmitOnceTest(unittest.TestCase):
+    def test_admitted_calls_take_no_tokens(self):
+        scheduler = LLMScheduler(learner_rate=0.001, learner_burst=1, max_wait=0.1)
+        scheduler.admit(learner="a", route="rewrite")
+        start = time.monotonic()
+        for _ in range(12):
+            scheduler.call(lambda: None, learner="a", route="rewrite", admitted=True)
+        self.assertLess(time.monotonic() - start, 0.1)
+        # The one token went to the admission
+        with self.assertRaises(RateLimited):
+            scheduler.admit(learner="a", route="rewrite")
+
+
+class LearnerIdTest(unittest.TestCase):
+    def test_client_header_is_ignored(self):
+        from flask import Flask, session
+        from llm_scheduler import learner_id
+        app = Flask(__name__)
+        app.secret_key = "test"
+        headers = {"X-Learner-Id": "someone-else"}
+        with app.test_request_context(headers=headers, environ_base={"REMOTE_ADDR": "10.0.0.7"}) as ctx:
+            self.assertEqual(learner_id(ctx.request), "10.0.0.7")
+            session["learner_id"] = "learner-1"
+            self.assertEqual(learner_id(ctx.request), "learner-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
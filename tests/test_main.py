@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from werkzeug.test import Client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("NEUROBRIDGE_PROFILES_DB", os.path.join(_tmp.name, "profiles.sqlite3"))
+os.environ.setdefault("NEUROBRIDGE_MASTER_KEY_FILE", os.path.join(_tmp.name, "master.key"))
+os.environ.setdefault("NEUROBRIDGE_SCRYPT_N", "1024")
+os.environ.setdefault("FLASK_SECRET_KEY", "test")
+sys.path.insert(0, ROOT)
+
+import main
+
+
+def signed_in_client(email):
+    client = Client(main.app)
+    response = client.post("/api/register", json={"email": email, "password": "pw", "name": "Test"})
+    assert response.status_code == 201, response.get_data()
+    return client, json.loads(response.get_data())["learner_id"]
+
+
+class PlanOwnershipTest(unittest.TestCase):
+    def test_plans_need_a_session_and_stay_private(self):
+        owner, owner_id = signed_in_client("owner@example.com")
+        self.assertEqual(owner.post("/api/plan", json={"subjects": ["Physics"]}).status_code, 200)
+
+        # Naming the owner in a header no longer reaches their plan
+        anonymous = Client(main.app)
+        headers = {"X-Learner-Id": owner_id}
+        self.assertEqual(anonymous.get("/api/plan", headers=headers).status_code, 401)
+        self.assertEqual(anonymous.post("/api/plan/replan", headers=headers,
+                                        json={"deltas": [{"type": "unavailable", "day": "Monday"}]}).status_code, 401)
+
+        other, _ = signed_in_client("other@example.com")
+        self.assertEqual(other.get("/api/plan", headers=headers).status_code, 404)
+        self.assertEqual(owner.get("/api/plan").status_code, 200)
+
+
+class SessionStartTest(unittest.TestCase):
+    def start(self, body):
+        response = Client(main.app).post("/api/session/start", json=body)
+        return response.status_code, json.loads(response.get_data())
+
+    def test_invalid_deadline_is_rejected(self):
+        for deadline in ["soon", -1, 0, True, None]:
+            self.assertEqual(self.start({"deadline": deadline})[0], 400, deadline)
+
+    def test_explanations_beyond_the_cap_are_reported_busy(self):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()  # one explanation already in flight
+        with mock.patch.object(main, "_explanation_slots", slots), \
+                mock.patch.object(main, "explain_topic", side_effect=AssertionError("should not run")):
+            status, body = self.start({"subject": "Physics", "topic": "Gravity", "subjects": ["Physics"]})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["steps"]["explanation"]["status"], "busy")
+        self.assertEqual(body["steps"]["plan"]["status"], "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from plan import DAYS_OF_WEEK, StudyPlanner
+
+SUBJECTS = ["Physics", "Chemistry", "History", "Art", "Biology"]
+
+
+class UnavailableDayTest(unittest.TestCase):
+    def test_round_trip_restores_the_original_order(self):
+        planner = StudyPlanner(SUBJECTS, random.Random(3))
+        before = planner.to_dict()
+        planner.apply([{"type": "unavailable", "day": "Tuesday"}])
+        planner.apply([{"type": "available", "day": "Tuesday"}])
+        self.assertEqual(planner.to_dict(), before)
+
+    def test_sessions_only_move_to_later_days(self):
+        planner = StudyPlanner(SUBJECTS, random.Random(5))
+        changed = planner.apply([{"type": "unavailable", "day": "Thursday"}])["changed"]
+        self.assertTrue(set(changed) <= {"Thursday", "Friday", "Saturday", "Sunday"})
+
+    def test_sunday_sessions_are_postponed_not_moved_back(self):
+        planner = StudyPlanner(SUBJECTS, random.Random(7))
+        changed = planner.apply([{"type": "unavailable", "day": "Sunday"}])["changed"]
+        self.assertEqual(list(changed), ["Sunday"])
+        self.assertTrue(any("postponed" in activity for activity in changed["Sunday"]))
+        for day in DAYS_OF_WEEK[:-1]:
+            self.assertFalse(any("moved from Sunday" in a for a in planner.to_dict()[day]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import cProfile
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from profiler import SamplingProfiler
+
+
+class StartRequestTest(unittest.TestCase):
+    def test_active_profiler_skips_the_request_instead_of_failing_it(self):
+        profiler = SamplingProfiler()
+        error = ValueError("Another profiling tool is already active")
+        with mock.patch.object(cProfile.Profile, "enable", side_effect=error):
+            self.assertIsNone(profiler.start_request())
+        self.assertEqual(profiler.status()["skipped_requests"], 1)
+
+
+class ClearStacksTest(unittest.TestCase):
+    def test_clearing_stacks_keeps_request_profiles(self):
+        profiler = SamplingProfiler()
+        profiler.finish_request(profiler.start_request())
+        profiler._stacks.update(["MainThread;main (app.py:1)"])
+        profiler.clear_stacks()
+        self.assertEqual(profiler.collapsed(), "")
+        self.assertEqual(profiler.status()["profiled_requests"], 1)
+        self.assertNotIn("No requests profiled", profiler.pstats_report())
+
+
+if __name__ == "__main__":
+    unittest.main()
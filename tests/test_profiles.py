@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from profiles import PasswordHasher, ProfileStore, load_secret_key
+
+
+class AuthenticateTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = ProfileStore(os.path.join(self._tmp.name, "profiles.sqlite3"), os.urandom(32),
+                                  hasher=PasswordHasher(n=1024))
+        self.store.register("known@example.com", "right")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_unknown_email_costs_a_hash_like_a_known_one(self):
+        with mock.patch.object(self.store.hasher, "verify", wraps=self.store.hasher.verify) as verify:
+            self.assertIsNone(self.store.authenticate("nobody@example.com", "guess"))
+            self.assertIsNone(self.store.authenticate("known@example.com", "guess"))
+        self.assertEqual(verify.call_count, 2)
+
+    def test_valid_credentials(self):
+        self.assertIsNotNone(self.store.authenticate("Known@Example.com", "right"))
+
+
+class SecretKeyTest(unittest.TestCase):
+    def test_generated_key_is_reused(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {"FLASK_SECRET_KEY": ""}):
+            path = os.path.join(tmp, "secret.key")
+            first = load_secret_key(path)
+            self.assertEqual(len(first), 32)
+            self.assertEqual(load_secret_key(path), first)
+
+    def test_environment_wins(self):
+        with mock.patch.dict(os.environ, {"FLASK_SECRET_KEY": "from-env"}):
+            self.assertEqual(load_secret_key("/nonexistent/secret.key"), b"from-env")
+
+
+if __name__ == "__main__":
+    unittest.main()
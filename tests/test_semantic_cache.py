@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from semantic_cache import SemanticCache
+
+
+class CountingEmbedder:
+    dim = 8
+    model_name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        vector = np.random.default_rng(abs(hash(text)) % 2 ** 32).standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def test_miss_then_store_embeds_once(self):
+        embed = CountingEmbedder()
+        cache = SemanticCache(embed)
+        self.assertIsNone(cache.lookup("noise makes me lose focus"))
+        cache.store("noise makes me lose focus", "ADHD (Medium)")
+        self.assertEqual(embed.calls, 1)
+        self.assertEqual(cache.lookup("Noise makes me  lose focus")[0], "ADHD (Medium)")
+        self.assertEqual(embed.calls, 1)
+
+    def test_saved_entries_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.npz")
+            cache = SemanticCache(CountingEmbedder(), path=path)
+            cache.store("avoids long paragraphs", "Dyslexia (Low)")
+            cache.store("can't sit still", "ADHD (High)")
+            reloaded = SemanticCache(CountingEmbedder(), path=path)
+            self.assertEqual(len(reloaded), 2)
+            self.assertEqual(reloaded.lookup("can't sit still")[0], "ADHD (High)")
+
+
+if __name__ == "__main__":
+    unittest.main()